@@ -0,0 +1,345 @@
+# CS122: Auto-completing keyboard using Tries
+# Compact array-backed trie
+#
+# Corry Ke
+#
+# Every node of the trie is a small integer index into a handful of flat
+# arrays instead of a Python object with its own dictionary.  Children are
+# kept as a first-child / next-sibling linked list, so the edges of the
+# trie need one slot per node and the siblings stay in insertion order.
+
+from array import array
+
+NO_NODE = -1
+ROOT = 0
+
+# (attribute, typecode) of the arrays of an ArrayTrie
+LAYOUT = [("chars", "I"),
+          ("first_child", "i"),
+          ("next_sibling", "i"),
+          ("counts", "i"),
+          ("finals", "B")]
+
+
+class ArrayNode(object):
+    '''
+    A lightweight view of one node of an ArrayTrie.  It exposes the same
+    count, final, child and children interface as TrieNode.
+    '''
+    __slots__ = ('trie', 'index')
+
+    def __init__(self, trie, index):
+        '''
+        Constructor
+
+        Inputs:
+            trie: (ArrayTrie) the trie that holds the node
+            index: (int) the index of the node in the trie arrays
+        '''
+        self.trie = trie
+        self.index = index
+
+    @property
+    def count(self):
+        return self.trie.counts[self.index]
+
+    @property
+    def final(self):
+        return self.trie.finals[self.index] == 1
+
+    def find(self, prefix):
+        '''
+        Walk down the trie from this node along the characters of prefix
+
+        Inputs:
+            prefix: (string) the characters to follow
+
+        Returns:
+            (ArrayNode) the node reached, or None if prefix leaves the trie
+        '''
+        i = self.trie.find_index(prefix, self.index)
+        if i == NO_NODE:
+            return None
+        return ArrayNode(self.trie, i)
+
+    def child(self, char):
+        '''
+        Get the child reached from this node by char
+
+        Inputs:
+            char: (str) a single character
+
+        Returns:
+            (ArrayNode) the child, or None if there is no such edge
+        '''
+        i = self.trie.find_child(self.index, char)
+        if i == NO_NODE:
+            return None
+        return ArrayNode(self.trie, i)
+
+    def children(self):
+        '''
+        Generate the (char, child) pairs of this node in insertion order
+        '''
+        trie = self.trie
+        chars = trie.chars
+        next_sibling = trie.next_sibling
+        i = trie.first_child[self.index]
+        while i != NO_NODE:
+            yield chr(chars[i]), ArrayNode(trie, i)
+            i = next_sibling[i]
+
+    def __repr__(self):
+        return f'ArrayNode({self.index}, count: {self.count}, final: {self.final})'
+
+
+class ArrayTrie(ArrayNode):
+    '''
+    The storage of an array-backed trie.  The trie object is also a view
+    of its own root node, so it can be used wherever a root TrieNode is.
+
+    For the node with index i:
+        chars[i]: code point of the edge leading into the node
+        first_child[i]: index of the first child, or NO_NODE
+        next_sibling[i]: index of the next sibling, or NO_NODE
+        counts[i]: number of words in the subtrie rooted at the node
+        finals[i]: 1 if a word ends at the node, 0 otherwise
+    '''
+    __slots__ = ('chars', 'first_child', 'next_sibling', 'counts', 'finals',
+                 '_last_word', '_last_path')
+
+    def __init__(self):
+        '''
+        Constructor: build an empty trie that only holds the root.
+        '''
+        super().__init__(self, ROOT)
+        self.chars = array('I', [0])
+        self.first_child = array('i', [NO_NODE])
+        self.next_sibling = array('i', [NO_NODE])
+        self.counts = array('i', [0])
+        self.finals = bytearray(1)
+        # the path of node indices of the most recently added word
+        self._last_word = ''
+        self._last_path = [ROOT]
+
+    @classmethod
+    def from_buffers(cls, chars, first_child, next_sibling, counts, finals):
+        '''
+        Build a trie over existing buffers without copying them, e.g.
+        memoryviews of a memory-mapped snapshot.  The buffers are copied
+        (see thaw) the first time a word is added or removed.
+
+        Inputs:
+            chars, first_child, next_sibling, counts, finals: indexable
+              buffers laid out like the arrays of an ArrayTrie
+
+        Returns:
+            (ArrayTrie) the trie
+        '''
+        trie = cls.__new__(cls)
+        ArrayNode.__init__(trie, trie, ROOT)
+        trie.chars = chars
+        trie.first_child = first_child
+        trie.next_sibling = next_sibling
+        trie.counts = counts
+        trie.finals = finals
+        trie._last_word = ''
+        trie._last_path = [ROOT]
+        return trie
+
+    def thaw(self):
+        '''
+        Copy buffers the trie does not own (see from_buffers) into arrays
+        of its own, so that words can be added and removed.  Does nothing
+        if the trie already owns its arrays.
+        '''
+        if isinstance(self.counts, array):
+            return
+        for name, typecode in LAYOUT[:-1]:
+            a = array(typecode)
+            a.frombytes(memoryview(getattr(self, name)).cast("B"))
+            setattr(self, name, a)
+        self.finals = bytearray(self.finals)
+
+    def __len__(self):
+        '''
+        The number of nodes in the trie, including the root
+        '''
+        return len(self.counts)
+
+    def find_child(self, i, char):
+        '''
+        Find the child of node i along the edge labeled char
+
+        Inputs:
+            i: (int) index of the parent node
+            char: (str) a single character
+
+        Returns:
+            (int) index of the child or NO_NODE
+        '''
+        code = ord(char)
+        chars = self.chars
+        next_sibling = self.next_sibling
+        j = self.first_child[i]
+        while j != NO_NODE and chars[j] != code:
+            j = next_sibling[j]
+        return j
+
+    def find_index(self, prefix, i=ROOT):
+        '''
+        Walk down from node i along the characters of prefix
+
+        Inputs:
+            prefix: (string) the characters to follow
+            i: (int) index of the starting node
+
+        Returns:
+            (int) index of the node reached or NO_NODE
+        '''
+        chars = self.chars
+        first_child = self.first_child
+        next_sibling = self.next_sibling
+        for char in prefix:
+            code = ord(char)
+            i = first_child[i]
+            while i != NO_NODE and chars[i] != code:
+                i = next_sibling[i]
+            if i == NO_NODE:
+                return NO_NODE
+        return i
+
+    def add_word(self, word):
+        '''
+        Add a word to the trie with a single iterative walk.  The walk
+        starts from the end of the longest common prefix with the word
+        added before, so sorted input only touches the new suffix.
+
+        Inputs:
+            word: (string) the complete word we are adding to the trie
+
+        Returns:
+            (bool) False if the word was already in the trie, True otherwise
+        '''
+        self.thaw()
+        chars = self.chars
+        first_child = self.first_child
+        next_sibling = self.next_sibling
+        counts = self.counts
+        finals = self.finals
+
+        prev = self._last_word
+        path = self._last_path
+        n = min(len(prev), len(word))
+        k = 0
+        while k < n and prev[k] == word[k]:
+            k += 1
+        del path[k + 1:]
+
+        i = path[k]
+        creating = False
+        for char in word[k:]:
+            code = ord(char)
+            if not creating:
+                j = first_child[i]
+                last = NO_NODE
+                while j != NO_NODE and chars[j] != code:
+                    last = j
+                    j = next_sibling[j]
+                if j != NO_NODE:
+                    path.append(j)
+                    i = j
+                    continue
+                creating = True
+            else:
+                last = NO_NODE
+
+            j = len(counts)
+            chars.append(code)
+            first_child.append(NO_NODE)
+            next_sibling.append(NO_NODE)
+            counts.append(0)
+            finals.append(0)
+            if last == NO_NODE:
+                first_child[i] = j
+            else:
+                next_sibling[last] = j
+            path.append(j)
+            i = j
+
+        self._last_word = word
+        if finals[i]:
+            return False
+        finals[i] = 1
+        for j in path:
+            counts[j] += 1
+        return True
+
+    def add_words(self, words):
+        '''
+        Add many words; add_word already reuses the path of the
+        previous word.
+
+        Inputs:
+            words: (iterable of strings) the words to add
+
+        Returns:
+            (int) the number of words that were not in the trie yet
+        '''
+        add_word = self.add_word
+        return sum(1 for w in words if add_word(w))
+
+    def remove_word(self, word):
+        '''
+        Remove a word from the trie.  The branch that held only this word
+        is unlinked from its parent; its slots in the arrays are left
+        unused until the trie is rebuilt (e.g. by writing a snapshot of
+        the words and loading it).
+
+        Inputs:
+            word: (string) the word to remove
+
+        Returns:
+            (bool) True if the word was in the trie, False otherwise
+        '''
+        self.thaw()
+        path = [ROOT]
+        i = ROOT
+        for char in word:
+            i = self.find_child(i, char)
+            if i == NO_NODE:
+                return False
+            path.append(i)
+        finals = self.finals
+        if not finals[i]:
+            return False
+
+        finals[i] = 0
+        counts = self.counts
+        for j in path:
+            counts[j] -= 1
+        for d in range(1, len(path)):
+            if counts[path[d]] == 0:
+                self._unlink(path[d - 1], path[d])
+                break
+        # the path of the last added word may run through unlinked nodes
+        self._last_word = ''
+        self._last_path = [ROOT]
+        return True
+
+    def _unlink(self, parent, i):
+        '''
+        Remove node i from the children of node parent
+        '''
+        first_child = self.first_child
+        next_sibling = self.next_sibling
+        j = first_child[parent]
+        if j == i:
+            first_child[parent] = next_sibling[i]
+            return
+        while next_sibling[j] != i:
+            j = next_sibling[j]
+        next_sibling[j] = next_sibling[i]
+
+    def __repr__(self):
+        return f'ArrayTrie({len(self)} nodes, {self.count} words)'
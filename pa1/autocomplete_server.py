@@ -0,0 +1,306 @@
+# CS122: Auto-completing keyboard
+# Multi-process autocomplete server
+#
+# Corry Ke
+#
+# The dictionary is loaded once, then the listening socket is opened and
+# the process forks into workers that all accept on that socket.  Each
+# worker runs an asyncio server, and the kernel spreads connections over
+# them.  The workers share the pages of the dictionary copy-on-write;
+# the array backend (or a memory-mapped snapshot) is the one to use,
+# because its data lives in a few large buffers that are never written,
+# while every TrieNode object would be copied as soon as a worker touches
+# its reference count.
+#
+# Protocol: newline-delimited JSON over TCP.  A request is an object
+#   {"op": "complete", "prefix": "ab", "limit": 10, "offset": 0}
+#   {"op": "complete", "prefix": "ab", "ranked": true, "limit": 10}
+#   {"op": "count", "prefix": "ab"}
+#   {"op": "is_word", "word": "abacus"}
+#   {"op": "stats"}
+# and is answered by one line with {"ok": true, "result": ..., "us": ...},
+# where "us" is the time spent on the request in microseconds, or with
+# {"ok": false, "error": ...}.  A line holding a JSON array of requests is
+# a batch and is answered by one line holding the array of answers.
+# Connections can pipeline requests; answers come back in order.
+#
+# Usage:
+#   python3 autocomplete_server.py WORD_FILE [--port 8122] [--workers N]
+#                                  [--cache-mb MB]
+
+import argparse
+import asyncio
+import gc
+import json
+import os
+import signal
+import socket
+import sys
+import time
+
+import completion_cache
+import english_dictionary
+
+DEFAULT_PORT = 8122
+DEFAULT_LIMIT = 10
+# the longest request line accepted, in bytes
+MAX_LINE = 1 << 20
+
+
+class RequestError(Exception):
+    '''
+    A request that cannot be answered
+    '''
+
+
+class Handler(object):
+    def __init__(self, eng_dict):
+        '''
+        Constructor
+
+        Inputs:
+            eng_dict: (EnglishDictionary) the dictionary to query
+        '''
+        self.eng_dict = eng_dict
+        # op -> [number of requests, total time in seconds]
+        self.stats = {}
+        self.ops = {"complete": self.complete,
+                    "count": self.count,
+                    "is_word": self.is_word,
+                    "stats": self.get_stats}
+
+    def complete(self, request):
+        prefix = _string(request, "prefix")
+        limit = _int(request, "limit", DEFAULT_LIMIT)
+        if request.get("ranked"):
+            suffixes = self.eng_dict.top_completions(prefix, limit)
+        else:
+            offset = _int(request, "offset", 0)
+            suffixes = list(self.eng_dict.iter_completions(prefix, limit,
+                                                           offset))
+        return [prefix + s for s in suffixes]
+
+    def count(self, request):
+        return self.eng_dict.num_completions(_string(request, "prefix"))
+
+    def is_word(self, request):
+        return self.eng_dict.is_word(_string(request, "word"))
+
+    def get_stats(self, request):
+        rv = {"pid": os.getpid(),
+              "ops": {op: {"count": n, "mean_us": 1e6 * total / n}
+                      for op, (n, total) in self.stats.items()}}
+        if hasattr(self.eng_dict, "cache_stats"):
+            rv["cache"] = self.eng_dict.cache_stats()
+        return rv
+
+    def answer(self, request):
+        '''
+        Answer one request
+
+        Inputs:
+            request: the decoded JSON request
+
+        Returns:
+            (dict) the answer
+        '''
+        start = time.perf_counter()
+        try:
+            if not isinstance(request, dict):
+                raise RequestError("a request must be a JSON object")
+            op = request.get("op")
+            if not isinstance(op, str) or op not in self.ops:
+                raise RequestError("unknown op: %r" % (op,))
+            result = self.ops[op](request)
+        except RequestError as e:
+            return {"ok": False, "error": str(e)}
+        except Exception as e:
+            # one bad request must not take the batch or the connection
+            # down with it
+            return {"ok": False,
+                    "error": "%s: %s" % (type(e).__name__, e)}
+        elapsed = time.perf_counter() - start
+        stat = self.stats.setdefault(op, [0, 0.0])
+        stat[0] += 1
+        stat[1] += elapsed
+        return {"ok": True, "result": result, "us": round(1e6 * elapsed, 1)}
+
+    def answer_line(self, line):
+        '''
+        Answer one request line, which holds a request or a batch
+
+        Inputs:
+            line: (bytes) the line
+
+        Returns:
+            (bytes) the answer line
+        '''
+        try:
+            request = json.loads(line)
+        except ValueError:
+            rv = {"ok": False, "error": "malformed JSON"}
+        else:
+            if isinstance(request, list):
+                rv = [self.answer(r) for r in request]
+            else:
+                rv = self.answer(request)
+        return json.dumps(rv).encode() + b"\n"
+
+
+def _string(request, key):
+    value = request.get(key)
+    if not isinstance(value, str):
+        raise RequestError("%s must be a string" % key)
+    return value
+
+
+def _int(request, key, default):
+    value = request.get(key, default)
+    if not isinstance(value, int) or value < 0:
+        raise RequestError("%s must be a non-negative integer" % key)
+    return value
+
+
+async def serve(sock, handler):
+    '''
+    Answer connections on a listening socket until cancelled
+
+    Inputs:
+        sock: (socket) the listening socket
+        handler: (Handler) answers the requests
+    '''
+    async def client(reader, writer):
+        try:
+            while True:
+                try:
+                    line = await reader.readline()
+                except ValueError:
+                    # the line is longer than MAX_LINE
+                    break
+                if not line:
+                    break
+                if line.strip():
+                    writer.write(handler.answer_line(line))
+                    await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    server = await asyncio.start_server(client, sock=sock, limit=MAX_LINE)
+    async with server:
+        await server.serve_forever()
+
+
+def listen(host, port, backlog=1024):
+    '''
+    Open the listening socket that the workers share
+    '''
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(backlog)
+    sock.setblocking(False)
+    return sock
+
+
+def run_workers(eng_dict, sock, num_workers, cache_bytes=None):
+    '''
+    Fork the workers and wait for them.  SIGINT or SIGTERM stops them all.
+
+    Inputs:
+        eng_dict: (EnglishDictionary) the loaded dictionary
+        sock: (socket) the listening socket
+        num_workers: (int) the number of worker processes
+        cache_bytes: (int) the budget of each worker's completion cache,
+          or None for no cache
+    '''
+    # move everything loaded so far out of the collector's reach, so the
+    # workers' collections do not write to (and copy) the shared pages
+    gc.freeze()
+    pids = []
+    for _ in range(num_workers):
+        pid = os.fork()
+        if pid == 0:
+            signal.signal(signal.SIGINT, signal.SIG_DFL)
+            signal.signal(signal.SIGTERM, signal.SIG_DFL)
+            if cache_bytes is not None:
+                eng_dict = completion_cache.CachedDictionary(eng_dict,
+                                                             cache_bytes)
+            try:
+                asyncio.run(serve(sock, Handler(eng_dict)))
+            finally:
+                os._exit(0)
+        pids.append(pid)
+
+    def stop(signum, frame):
+        for pid in pids:
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    signal.signal(signal.SIGINT, stop)
+    signal.signal(signal.SIGTERM, stop)
+    for pid in pids:
+        while True:
+            try:
+                os.waitpid(pid, 0)
+                break
+            except InterruptedError:
+                continue
+            except ChildProcessError:
+                break
+
+
+def query(requests, host="127.0.0.1", port=DEFAULT_PORT):
+    '''
+    Send requests to a server over one connection and collect the answers.
+    Each element of requests is a request or a list of requests (a batch).
+
+    Inputs:
+        requests: (list) the requests
+        host, port: the address of the server
+
+    Returns:
+        (list) the answers, in order
+    '''
+    with socket.create_connection((host, port)) as sock:
+        f = sock.makefile("rwb")
+        for r in requests:
+            f.write(json.dumps(r).encode() + b"\n")
+        f.flush()
+        return [json.loads(f.readline()) for _ in requests]
+
+
+def main(argv):
+    parser = argparse.ArgumentParser(description="Serve autocompletions")
+    parser.add_argument("wordfile")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--backend", default="array")
+    parser.add_argument("--snapshot")
+    parser.add_argument("--freqfile")
+    parser.add_argument("--cache-mb", type=float,
+                        help="give each worker an LRU completion cache of "
+                        "this many megabytes")
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    eng_dict = english_dictionary.EnglishDictionary(
+        args.wordfile, backend=args.backend, snapshot=args.snapshot,
+        freqfile=args.freqfile)
+    sock = listen(args.host, args.port)
+    print("Loaded %d words in %.2f s; serving on %s:%d with %d workers"
+          % (eng_dict.num_completions(""), time.perf_counter() - start,
+             args.host, args.port, args.workers))
+    sys.stdout.flush()
+    cache_bytes = None
+    if args.cache_mb is not None:
+        cache_bytes = int(args.cache_mb * 1024 * 1024)
+    run_workers(eng_dict, sock, args.workers, cache_bytes)
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -19,11 +19,16 @@ import sys
 import tty
 import termios
 import fcntl
-import string
 import importlib
+import unicodedata
 
 module = None
 
+# the largest number of candidates printed on Tab
+MAX_CANDIDATES = 10
+# the largest number of corrections printed for a misspelled word
+MAX_SUGGESTIONS = 20
+
 
 def load_trie_module(name):
     global module
@@ -100,10 +105,12 @@ def did_you_mean(eng_dict, word):
     Return a list of possible correct words that are "near" to the
     current word.
     '''
-    fv = []  # trie.fuzzy_versions(t, word)
+    if word == "" or not hasattr(eng_dict, "fuzzy_versions"):
+        return
+    fv = eng_dict.fuzzy_versions(word, limit=MAX_SUGGESTIONS)
     if len(fv) == 0:
         return
-    if len(fv) <= 20:
+    if len(fv) <= MAX_SUGGESTIONS:
         print("Did you mean one of these?")
         for maybe in fv:
             for c in maybe:
@@ -130,13 +137,75 @@ def prompt(message, word):
     sys.stdout.flush()
 
 
-def process_completions(eng_dict, message, word, print_candidates):
+def completion_candidates(eng_dict, word):
+    '''
+    Return up to MAX_CANDIDATES completions of word, ranked by frequency
+    when the dictionary supports it.
+    '''
+    if hasattr(eng_dict, "top_completions"):
+        return eng_dict.top_completions(word, MAX_CANDIDATES)
+    return eng_dict.iter_completions(word, limit=MAX_CANDIDATES)
+
+
+class WordCursor(object):
+    '''
+    A stand-in for the PrefixCursor of dictionaries that do not have one:
+    it keeps the typed word and asks the dictionary about it each time.
+    '''
+
+    def __init__(self, eng_dict):
+        self.eng_dict = eng_dict
+        self.reset()
+
+    def reset(self):
+        self.chars = []
+
+    def advance(self, char):
+        self.chars.append(char)
+
+    def back(self):
+        if self.chars:
+            self.chars.pop()
+
+    @property
+    def prefix(self):
+        return "".join(self.chars)
+
+    def is_word(self):
+        return self.eng_dict.is_word(self.prefix)
+
+    def num_completions(self):
+        return self.eng_dict.num_completions(self.prefix)
+
+    def iter_completions(self, limit=None, offset=0):
+        return self.eng_dict.iter_completions(self.prefix, limit, offset)
+
+
+def new_cursor(eng_dict, word=""):
+    '''
+    Return a cursor positioned at the end of word
+    '''
+    if hasattr(eng_dict, "cursor"):
+        cursor = eng_dict.cursor()
+    else:
+        cursor = WordCursor(eng_dict)
+    for c in word:
+        cursor.advance(c)
+    return cursor
+
+
+def process_completions(eng_dict, message, word, print_candidates,
+                        cursor=None):
     '''
     Process the current "word" and generate a new message and prompt,
     information about possible completions, an error message, or
-    information about possible corrections to the word.
+    information about possible corrections to the word.  cursor, if
+    given, must be positioned at the end of word; it is reset when the
+    word is completed.
     '''
-    n = eng_dict.num_completions(word)
+    if cursor is None:
+        cursor = new_cursor(eng_dict, word)
+    n = cursor.num_completions()
     misspelled = False
 
     if n == 0:
@@ -148,45 +217,51 @@ def process_completions(eng_dict, message, word, print_candidates):
     elif n == 1:
         # If there is only one possible completion, go ahead and add
         # the word to the message.
-        word += eng_dict.get_completions(word)[0]
+        word += next(cursor.iter_completions(limit=1))
         if len(message) > 0:
             message += " "
         message += word
         word = ""
+        cursor.reset()
         print()
         prompt(message, word)
     else:
         if print_candidates:
-            if n > 10:
+            if n > MAX_CANDIDATES:
                 print("\n(" + str(n) + " completions)")
             else:
                 print()
-                for com in eng_dict.get_completions(word):
-                    print(word + com)
+            for com in completion_candidates(eng_dict, word):
+                print(word + com)
             prompt(message, word)
 
     return message, word, misspelled
 
 
-def shell(eng_dict):
+def shell(eng_dict, read_key=None):
     '''
     Gather characters from stdin and handle requests for auto
-    completion, reset, etc.
+    completion, reset, etc.  read_key, if given, is called instead of
+    getch to get each character (e.g. to replay recorded keystrokes).
 
     Type Control-C to get out of this shell.
     '''
+    if read_key is None:
+        read_key = getch
     message = ""
     word = ""
     misspelled = False
+    cursor = new_cursor(eng_dict)
     prompt(message, word)
     while True:
         # Get a character
-        c = getch()
+        c = read_key()
 
         # Control-D resets the message
         if ord(c) == 4:
             message = ""
             word = ""
+            cursor.reset()
             misspelled = False
             print()
             prompt(message, word)
@@ -197,7 +272,7 @@ def shell(eng_dict):
             if misspelled:
                 misspelled_prompt(message, eng_dict, word)
             else:
-                if not eng_dict.is_word(word):
+                if not cursor.is_word():
                     print("\nWord '%s' does not exist" % word)
                     did_you_mean(eng_dict, word)
                     prompt(message, word)
@@ -206,6 +281,7 @@ def shell(eng_dict):
                         message += " "
                     message += word
                     word = ""
+                    cursor.reset()
                     print()
                     prompt(message, word)
 
@@ -214,7 +290,8 @@ def shell(eng_dict):
         # Autocomplete
         if c == "\t":
             if word != "":
-                message, word, misspelled = process_completions(eng_dict, message, word, print_candidates=True)
+                message, word, misspelled = process_completions(
+                    eng_dict, message, word, True, cursor)
             continue
 
         # Backspace
@@ -223,15 +300,16 @@ def shell(eng_dict):
                 print("cannot change previous word once accepted")
                 continue
             word = word[:len(word) - 1]
+            cursor.back()
             sys.stdout.write('\r')
             sys.stdout.flush()
             prompt(message, word + " ")
             sys.stdout.write('\b')
             sys.stdout.flush()
         else:
-            # If the character is not a letter, we're not interested
-            # in it.
-            if c not in string.ascii_letters:
+            # If the character is not a letter (or an accent typed on
+            # its own), we're not interested in it.
+            if not (c.isalpha() or unicodedata.combining(c)):
                 message = "5:" + message
                 continue
 
@@ -239,8 +317,10 @@ def shell(eng_dict):
             sys.stdout.write(c)
             sys.stdout.flush()
             word = word + c
+            cursor.advance(c)
 
-        message, word, misspelled = process_completions(eng_dict, message, word, print_candidates=False)
+        message, word, misspelled = process_completions(
+            eng_dict, message, word, False, cursor)
 
 
 def go(module_name=None):
@@ -254,8 +334,13 @@ def go(module_name=None):
     if module_name:
         module = __import__(module_name)
 
-    if(len(sys.argv) != 2):
-        print("Usage: python3 english_dictionary.py WORD_FILE")
+    snapshots = getattr(module.EnglishDictionary, "SNAPSHOTS", False)
+    if len(sys.argv) not in ((2, 3) if snapshots else (2,)):
+        if snapshots:
+            print("Usage: python3 %s.py WORD_FILE [SNAPSHOT_FILE]"
+                  % module.__name__)
+        else:
+            print("Usage: python3 %s.py WORD_FILE" % module.__name__)
         exit(1)
 
     wordfile = sys.argv[1]
@@ -265,7 +350,10 @@ def go(module_name=None):
         exit(1)
 
     print("Loading words into trie...",)
-    eng_dict = module.EnglishDictionary(wordfile)
+    if len(sys.argv) == 3:
+        eng_dict = module.EnglishDictionary(wordfile, snapshot=sys.argv[2])
+    else:
+        eng_dict = module.EnglishDictionary(wordfile)
     print(" done")
     print("===================================================")
     print("      Welcome to the auto-completing shell!")
@@ -0,0 +1,150 @@
+# CS122: Auto-completing keyboard using Tries
+# Batched is_word and num_completions queries
+#
+# Corry Ke
+#
+# Spellchecking a document asks about the same tokens many times, and
+# sorted tokens share prefixes with their neighbours.  A batch is
+# de-duplicated and sorted, each distinct string is looked up once, and
+# the walk for a string starts from the node of the longest earlier
+# string that is a prefix of it ("lab", then "labor" from "lab"), so a
+# shared prefix is walked once.  The answers are scattered back to the
+# positions of the input as a numpy array.
+#
+# Usage (spellcheck a text file):
+#   python3 batch_queries.py WORD_FILE TEXT_FILE
+
+import re
+import sys
+import time
+
+import numpy
+
+import english_dictionary
+
+# the tokens of a text: runs of letters
+TOKEN_RE = re.compile(r"[^\W\d_]+")
+
+
+def find_sorted(root, strings):
+    '''
+    Find the trie positions of strings in sorted order.  In sorted order
+    the strings that are prefixes of the current one form a stack, and
+    the walk for a string starts from the node of the longest of them.
+
+    Inputs:
+        root: the root node of the trie
+        strings: (list of strings) sorted, without repeats
+
+    Returns:
+        (list) the node of each string, or None if it leaves the trie
+    '''
+    nodes = []
+    # (string, node) of the earlier strings that are prefixes of the
+    # current one, shortest first
+    stack = [('', root)]
+    for s in strings:
+        while not s.startswith(stack[-1][0]):
+            stack.pop()
+        base, node = stack[-1]
+        if node is not None:
+            node = node.find(s[len(base):])
+        nodes.append(node)
+        stack.append((s, node))
+    return nodes
+
+
+def _lookup(eng_dict, strings, value, dtype):
+    '''
+    Look up every distinct string once and scatter the answers
+
+    Inputs:
+        eng_dict: (EnglishDictionary) the dictionary
+        strings: (sequence of strings) the batch
+        value: (function) maps a node (or None) to the answer
+        dtype: the numpy type of the answers
+
+    Returns:
+        (numpy array) the answer for each string of the batch
+    '''
+    distinct = sorted(set(strings))
+    normalizer = eng_dict.normalizer
+    if normalizer is None:
+        nodes = find_sorted(eng_dict.words, distinct)
+    else:
+        # normalized keys can repeat and are no longer in order
+        keys = [normalizer(s) for s in distinct]
+        ordered = sorted(set(keys))
+        node_of = dict(zip(ordered, find_sorted(eng_dict.words, ordered)))
+        nodes = [node_of[k] for k in keys]
+
+    answer = dict(zip(distinct, map(value, nodes)))
+    return numpy.fromiter((answer[s] for s in strings), dtype=dtype,
+                          count=len(strings))
+
+
+def _is_word(node):
+    return node is not None and node.final
+
+
+def _count(node):
+    return 0 if node is None else node.count
+
+
+def is_word_many(eng_dict, tokens):
+    '''
+    Which tokens are words?
+
+    Inputs:
+        eng_dict: (EnglishDictionary) the dictionary
+        tokens: (sequence of strings) the tokens
+
+    Returns:
+        (numpy array of bool) whether each token is a word
+    '''
+    return _lookup(eng_dict, tokens, _is_word, bool)
+
+
+def num_completions_many(eng_dict, prefixes):
+    '''
+    How many words start with each prefix?
+
+    Inputs:
+        eng_dict: (EnglishDictionary) the dictionary
+        prefixes: (sequence of strings) the prefixes
+
+    Returns:
+        (numpy array of int) the number of completions of each prefix
+    '''
+    return _lookup(eng_dict, prefixes, _count, numpy.int64)
+
+
+def spellcheck(eng_dict, text):
+    '''
+    Find the tokens of a text that are not words
+
+    Inputs:
+        eng_dict: (EnglishDictionary) the dictionary
+        text: (string) the text
+
+    Returns:
+        (list of strings) the misspelled tokens, in order of appearance
+    '''
+    tokens = TOKEN_RE.findall(text)
+    known = is_word_many(eng_dict, tokens)
+    return [t for t, ok in zip(tokens, known) if not ok]
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 3:
+        print("Usage: python3 batch_queries.py WORD_FILE TEXT_FILE")
+        sys.exit(1)
+    eng_dict = english_dictionary.EnglishDictionary(sys.argv[1])
+    with open(sys.argv[2], encoding="utf-8", errors="replace") as f:
+        text = f.read()
+    start = time.perf_counter()
+    misspelled = spellcheck(eng_dict, text)
+    elapsed = time.perf_counter() - start
+    print("%d tokens, %d not in the dictionary (%d distinct), %.1f ms"
+          % (len(TOKEN_RE.findall(text)), len(misspelled),
+             len(set(misspelled)), 1000 * elapsed))
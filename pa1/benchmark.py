@@ -0,0 +1,428 @@
+# CS122: Auto-completing keyboard
+# Benchmark and latency harness for the EnglishDictionary implementations
+#
+# Corry Ke
+#
+# A run loads a word file (web2, or a synthetic dictionary of any size
+# derived from it) into the EnglishDictionary of a module, then replays a
+# keystroke trace through autocorrect_shell.shell, so the dictionary sees
+# exactly the calls the interactive shell makes.  Every call is timed, and
+# the build time, peak RSS and per-operation latency percentiles are
+# printed and can be appended as one JSON object per line to a results
+# file for tracking regressions.  The dictionary is built and queried in
+# a separate process, so its peak RSS does not include the word lists
+# and the trace the harness builds; the growth of the peak across the
+# constructor is reported too.
+#
+# Examples:
+#   python3 benchmark.py web2
+#   python3 benchmark.py web2 --module english_dictionary --backend array
+#   python3 benchmark.py web2 --synthetic 1000000 --output bench.jsonl
+#   python3 benchmark.py web2 --save-trace trace.json
+#   python3 benchmark.py web2 --trace trace.json --module english_dictionary_dawg
+
+import argparse
+import bisect
+import contextlib
+import importlib
+import io
+import json
+import multiprocessing
+import os
+import platform
+import random
+import resource
+import string
+import sys
+import tempfile
+import time
+
+import autocorrect_shell
+import completion_cache
+
+# the dictionary and cursor operations that are timed
+TIMED_OPS = ["is_word", "num_completions", "get_completions",
+             "iter_completions", "top_completions", "fuzzy_versions"]
+
+BACKSPACE = chr(127)
+
+
+class Latencies(object):
+    def __init__(self):
+        '''
+        Constructor: no samples yet.
+        '''
+        self.samples = {}
+
+    def call(self, name, f, *args, **kwargs):
+        '''
+        Call f and record how long it took under name.  Generators are
+        consumed inside the timing, so lazy calls are measured in full.
+        '''
+        start = time.perf_counter()
+        rv = f(*args, **kwargs)
+        if name == "iter_completions":
+            rv = iter(list(rv))
+        self.samples.setdefault(name, []).append(time.perf_counter() - start)
+        return rv
+
+    def summary(self):
+        '''
+        Summarize the samples of each operation
+
+        Returns:
+            (dict) mapping operation names to their count, mean, p50 and
+            p99 latencies in microseconds
+        '''
+        rv = {}
+        for name, samples in sorted(self.samples.items()):
+            samples = sorted(samples)
+            rv[name] = {"count": len(samples),
+                        "mean_us": 1e6 * sum(samples) / len(samples),
+                        "p50_us": 1e6 * percentile(samples, 0.50),
+                        "p99_us": 1e6 * percentile(samples, 0.99)}
+        return rv
+
+
+def percentile(sorted_samples, q):
+    '''
+    The nearest-rank q-quantile of a non-empty sorted list
+    '''
+    i = min(len(sorted_samples) - 1, int(q * len(sorted_samples)))
+    return sorted_samples[i]
+
+
+class _TimedWrapper(object):
+    '''
+    Forward the timed operations of an object to it through a Latencies.
+    Operations the object does not have stay missing, so the shell's
+    hasattr checks see the same interface.
+    '''
+
+    def __init__(self, target, latencies):
+        self._target = target
+        self._latencies = latencies
+
+    def __getattr__(self, name):
+        f = getattr(self._target, name)
+        if name not in TIMED_OPS:
+            return f
+        return lambda *args, **kwargs: self._latencies.call(
+            name, f, *args, **kwargs)
+
+
+class TimedDictionary(_TimedWrapper):
+    '''
+    An EnglishDictionary whose operations, and those of its cursors,
+    are timed.
+    '''
+
+    def cursor(self):
+        return _TimedWrapper(self._target.cursor(), self._latencies)
+
+
+def timed_dictionary(eng_dict, latencies):
+    '''
+    Wrap a dictionary so that its operations are recorded in latencies.
+    Only dictionaries that have cursors get timed cursors.
+    '''
+    if hasattr(eng_dict, "cursor"):
+        return TimedDictionary(eng_dict, latencies)
+    return _TimedWrapper(eng_dict, latencies)
+
+
+def make_trace(words, num_words, seed=0):
+    '''
+    Generate the keystrokes of someone typing random words.  Like a
+    shell user, they stop typing a word once it is the only completion
+    left, since the shell then completes it by itself; other words end
+    with a space.  Some words get Tab part way and some get a typo that
+    is erased with backspace.  Every tenth word is followed by Control-D.
+
+    Inputs:
+        words: (list of strings) the words to draw from
+        num_words: (int) the number of words to type
+        seed: (int) random seed
+
+    Returns:
+        (string) the keystrokes
+    '''
+    rng = random.Random(seed)
+    ordered = sorted(set(w for w in words
+                         if w and all(c in string.ascii_letters for c in w)))
+
+    def count(prefix):
+        # every character of the words sorts before chr(127)
+        return (bisect.bisect_left(ordered, prefix + chr(127))
+                - bisect.bisect_left(ordered, prefix))
+
+    keys = []
+    for i in range(num_words):
+        w = rng.choice(ordered)
+        n = 1
+        while n < len(w) and count(w[:n]) > 1:
+            n += 1
+        if count(w[:n]) == 1:
+            typed, end = w[:n], ""
+        else:
+            typed, end = w, " "
+
+        r = rng.random()
+        cut = rng.randint(0, len(typed) - 1)
+        if r < 0.2:
+            typed = typed[:cut] + "\t" + typed[cut:]
+        elif r < 0.3:
+            # a typo that does not trigger a completion of its own
+            typo = rng.choice(string.ascii_lowercase)
+            if count(typed[:cut] + typo) != 1:
+                typed = typed[:cut] + typo + BACKSPACE + typed[cut:]
+        keys.append(typed + end)
+        if i % 10 == 9:
+            keys.append(chr(4))
+    return "".join(keys)
+
+
+def replay(eng_dict, keys, latencies):
+    '''
+    Feed keystrokes to autocorrect_shell.shell with the output discarded
+
+    Inputs:
+        eng_dict: the dictionary under test
+        keys: (string) the keystrokes
+        latencies: (Latencies) where the operation timings go
+    '''
+    it = iter(keys)
+
+    def read_key():
+        for c in it:
+            return c
+        raise KeyboardInterrupt
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        try:
+            autocorrect_shell.shell(timed_dictionary(eng_dict, latencies),
+                                    read_key)
+        except KeyboardInterrupt:
+            pass
+
+
+def probe_completions(eng_dict, keys, latencies):
+    '''
+    Time get_completions, which the shell no longer calls, on the first
+    two letters of every word in the trace.
+    '''
+    for w in set(keys.split()):
+        prefix = "".join(c for c in w if c in string.ascii_letters)[:2]
+        if prefix:
+            latencies.call("get_completions", eng_dict.get_completions, prefix)
+
+
+def synthetic_words(words, n, seed=0):
+    '''
+    Generate about n distinct words that look like the given ones: every
+    real word is kept, and the rest are real words with a random suffix
+    of 1 to 4 letters, so prefixes are shared the way they are in real
+    dictionaries.
+    '''
+    rng = random.Random(seed)
+    rv = set(words)
+    while len(rv) < n:
+        suffix = "".join(rng.choice(string.ascii_lowercase)
+                         for _ in range(rng.randint(1, 4)))
+        rv.add(rng.choice(words) + suffix)
+    return sorted(rv, key=str.lower)
+
+
+def peak_rss_kb():
+    '''
+    Get the peak resident set size of this process, in kilobytes
+    '''
+    peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in kilobytes on Linux and in bytes on macOS
+    if sys.platform == "darwin":
+        peak_rss //= 1024
+    return peak_rss
+
+
+def run(module_name, wordfile, keys, options, cache_bytes=None):
+    '''
+    Build a dictionary, replay a trace against it and report the results
+
+    Inputs:
+        module_name: (string) module that defines EnglishDictionary
+        wordfile: (string) the word file
+        keys: (string) the keystroke trace
+        options: (dict) keyword arguments for the constructor
+        cache_bytes: (int) the budget of a completion cache put in front
+          of the dictionary, or None for no cache
+
+    Returns:
+        (dict) the results
+    '''
+    module = importlib.import_module(module_name)
+    rss_before = peak_rss_kb()
+    start = time.perf_counter()
+    eng_dict = module.EnglishDictionary(wordfile, **options)
+    build_s = time.perf_counter() - start
+    build_rss = peak_rss_kb() - rss_before
+    if cache_bytes is not None:
+        eng_dict = completion_cache.CachedDictionary(eng_dict, cache_bytes)
+
+    latencies = Latencies()
+    start = time.perf_counter()
+    replay(eng_dict, keys, latencies)
+    replay_s = time.perf_counter() - start
+    probe_completions(eng_dict, keys, latencies)
+
+    with open(wordfile) as f:
+        num_words = sum(1 for line in f if line.strip())
+
+    rv = {"module": module_name,
+          "options": options,
+          "wordfile": wordfile,
+          "words": num_words,
+          "keystrokes": len(keys),
+          "build_s": build_s,
+          "replay_s": replay_s,
+          "peak_rss_kb": peak_rss_kb(),
+          "build_rss_kb": build_rss,
+          "ops": latencies.summary(),
+          "python": platform.python_version(),
+          "time": time.strftime("%Y-%m-%dT%H:%M:%S")}
+    if cache_bytes is not None:
+        rv["cache"] = eng_dict.cache_stats()
+    return rv
+
+
+def _serve(conn):
+    '''
+    Wait for the arguments of run, and send back its results
+    '''
+    try:
+        args = conn.recv()
+    except EOFError:
+        return
+    conn.send(run(*args))
+    conn.close()
+
+
+class IsolatedRun(object):
+    def __init__(self):
+        '''
+        Constructor: start the process the benchmark runs in.  A process
+        starts with the peak RSS of its parent (exec does not reset it),
+        so it is started before the harness builds its word lists.
+        '''
+        ctx = multiprocessing.get_context("spawn")
+        self._conn, child_conn = ctx.Pipe()
+        self._process = ctx.Process(target=_serve, args=(child_conn,),
+                                    daemon=True)
+        self._process.start()
+        child_conn.close()
+
+    def run(self, *args):
+        '''
+        Call run with these arguments in the process
+
+        Returns:
+            (dict) the results
+        '''
+        self._conn.send(args)
+        try:
+            result = self._conn.recv()
+        except EOFError:
+            result = None
+        self._process.join()
+        if result is None:
+            raise RuntimeError("the benchmark process failed with exit "
+                               "code %s" % self._process.exitcode)
+        return result
+
+
+def print_report(result):
+    print("%s %s: %d words" % (result["module"], result["options"],
+                               result["words"]))
+    print("  build %.3f s (+%.1f MB), peak RSS %.1f MB, replay of %d keys "
+          "%.3f s" % (result["build_s"], result["build_rss_kb"] / 1024,
+                      result["peak_rss_kb"] / 1024, result["keystrokes"],
+                      result["replay_s"]))
+    for name, s in result["ops"].items():
+        print("  %-16s n=%-7d p50 %9.1f us  p99 %9.1f us"
+              % (name, s["count"], s["p50_us"], s["p99_us"]))
+    if "cache" in result:
+        c = result["cache"]
+        print("  cache: %d hits, %d misses (%.0f%%), %d entries, %.1f MB"
+              % (c["hits"], c["misses"], 100 * c["hit_rate"], c["entries"],
+                 c["bytes"] / (1024 * 1024)))
+
+
+def main(argv):
+    parser = argparse.ArgumentParser(
+        description="Benchmark an EnglishDictionary implementation")
+    parser.add_argument("wordfile")
+    parser.add_argument("--module", default="english_dictionary")
+    parser.add_argument("--backend",
+                        help="backend option of english_dictionary")
+    parser.add_argument("--synthetic", type=int, metavar="N",
+                        help="benchmark a synthetic dictionary of N words "
+                        "derived from wordfile")
+    parser.add_argument("--trace", help="JSON file with the keystrokes")
+    parser.add_argument("--trace-words", type=int, default=2000,
+                        help="words in a generated trace (default 2000)")
+    parser.add_argument("--save-trace", help="write the trace to this file")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--cache-mb", type=float,
+                        help="put an LRU completion cache of this many "
+                        "megabytes in front of the dictionary")
+    parser.add_argument("--output", help="append the results as a JSON "
+                        "line to this file")
+    args = parser.parse_args(argv)
+    runner = IsolatedRun()
+
+    with open(args.wordfile) as f:
+        words = [w.strip() for w in f if w.strip()]
+
+    wordfile = args.wordfile
+    tmp = None
+    if args.synthetic:
+        # the generated trace types words of the synthetic dictionary
+        words = synthetic_words(words, args.synthetic, args.seed)
+        fd, tmp = tempfile.mkstemp(prefix="words-", suffix=".txt")
+        with os.fdopen(fd, "w") as f:
+            for w in words:
+                f.write(w + "\n")
+        wordfile = tmp
+
+    if args.trace:
+        with open(args.trace) as f:
+            keys = json.load(f)
+    else:
+        keys = make_trace(words, args.trace_words, args.seed)
+    if args.save_trace:
+        with open(args.save_trace, "w") as f:
+            json.dump(keys, f)
+
+    options = {}
+    if args.backend:
+        options["backend"] = args.backend
+
+    try:
+        cache_bytes = None
+        if args.cache_mb is not None:
+            cache_bytes = int(args.cache_mb * 1024 * 1024)
+        result = runner.run(args.module, wordfile, keys, options,
+                            cache_bytes)
+    finally:
+        if tmp is not None:
+            os.remove(tmp)
+    if args.synthetic:
+        result["wordfile"] = "%s (synthetic)" % args.wordfile
+
+    print_report(result)
+    if args.output:
+        with open(args.output, "a") as f:
+            f.write(json.dumps(result, sort_keys=True) + "\n")
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,258 @@
+# CS122: Auto-completing keyboard using Tries
+# Read-only trie with UTF-8 byte edges in compact per-node tables
+#
+# Corry Ke
+#
+# The words are stored as UTF-8, one trie level per byte, so any script
+# can be stored and every edge label takes one byte.  The trie is built
+# in one pass over the sorted words and numbered in post-order: a node is
+# written out only when its last word has been added, and by then all of
+# its children have their numbers.  The edges of node i are then the
+# slices [start[i], start[i + 1]) of two flat tables, labels (the bytes,
+# in increasing order) and targets (the child numbers), and finding a
+# child is a bytearray.find over that slice.  A node costs 14 bytes.
+#
+# Queries still walk whole characters: the nodes in the middle of a
+# multi-byte character are never handed out, and children() yields one
+# (char, child) pair per character.
+
+from array import array
+
+SORTED_INPUT_ERROR = "words must be added to a ByteTrie in sorted order"
+NO_NODE = -1
+
+
+def _utf8_length(lead):
+    '''
+    The number of bytes of the UTF-8 sequence that starts with lead
+    '''
+    if lead < 0x80:
+        return 1
+    if lead < 0xE0:
+        return 2
+    if lead < 0xF0:
+        return 3
+    return 4
+
+
+class ByteNode(object):
+    '''
+    A view of one node of a ByteTrie that sits on a character boundary.
+    It exposes the count, final, find, child and children interface of
+    TrieNode.
+    '''
+    __slots__ = ('trie', 'index')
+
+    def __init__(self, trie, index):
+        '''
+        Constructor
+
+        Inputs:
+            trie: (ByteTrie) the trie that holds the node
+            index: (int) the number of the node
+        '''
+        self.trie = trie
+        self.index = index
+
+    @property
+    def count(self):
+        return self.trie.counts[self.index]
+
+    @property
+    def final(self):
+        return self.trie.finals[self.index] == 1
+
+    def find(self, prefix):
+        '''
+        Walk down the trie from this node along the characters of prefix
+
+        Inputs:
+            prefix: (string) the characters to follow
+
+        Returns:
+            (ByteNode) the node reached, or None if prefix leaves the trie
+        '''
+        i = self.trie.find_index(prefix.encode("utf-8"), self.index)
+        if i == NO_NODE:
+            return None
+        return ByteNode(self.trie, i)
+
+    def child(self, char):
+        '''
+        Get the child reached from this node by char
+
+        Inputs:
+            char: (str) a single character
+
+        Returns:
+            (ByteNode) the child, or None if there is no such edge
+        '''
+        return self.find(char)
+
+    def children(self):
+        '''
+        Generate the (char, child) pairs of this node in code point
+        order.  The bytes of a multi-byte character are followed down to
+        the node where the character ends.
+        '''
+        trie = self.trie
+        labels = trie.labels
+        targets = trie.targets
+        start = trie.start
+        i = self.index
+        for e in range(start[i], start[i + 1]):
+            lead = labels[e]
+            if lead < 0x80:
+                yield chr(lead), ByteNode(trie, targets[e])
+            else:
+                yield from trie._characters(bytes((lead,)), targets[e],
+                                            _utf8_length(lead) - 1)
+
+    def __repr__(self):
+        return f'ByteNode({self.index}, count: {self.count}, final: {self.final})'
+
+
+class ByteTrie(ByteNode):
+    '''
+    The storage of a byte trie, which is also a view of its root.  It is
+    filled once by add_words, from sorted words, and cannot be changed
+    afterwards.
+
+    For the node numbered i:
+        labels[start[i]:start[i + 1]]: the bytes of its edges, increasing
+        targets[start[i]:start[i + 1]]: the numbers of its children
+        counts[i]: number of words in the subtrie rooted at the node
+        finals[i]: 1 if a word ends at the node, 0 otherwise
+    '''
+    __slots__ = ('labels', 'targets', 'start', 'counts', 'finals')
+
+    SORTED_INPUT = True
+
+    def __init__(self):
+        '''
+        Constructor: an empty trie, whose root is the only node.
+        '''
+        super().__init__(self, 0)
+        self.labels = bytearray()
+        self.targets = array('i')
+        self.start = array('i', [0, 0])
+        self.counts = array('i', [0])
+        self.finals = bytearray(1)
+
+    def __len__(self):
+        '''
+        The number of nodes in the trie, including the root
+        '''
+        return len(self.counts)
+
+    def add_words(self, words):
+        '''
+        Build the trie from words in sorted order (code point order,
+        which is also the order of their UTF-8 bytes).  Repeated words
+        are skipped.
+
+        Inputs:
+            words: (iterable of strings) the words, sorted
+
+        Returns:
+            (int) the number of distinct words
+        '''
+        if self.count > 0:
+            raise ValueError("a ByteTrie is built by a single add_words")
+        labels = bytearray()
+        targets = array('i')
+        start = array('i', [0])
+        counts = array('i')
+        finals = bytearray()
+
+        # the open nodes along the path of the last word, root first:
+        # [final, count, edge labels, child numbers]
+        stack = [[0, 0, bytearray(), []]]
+        prev = b''
+
+        def close(frame):
+            # number the node and write out its edges
+            final, count, edge_labels, children = frame
+            labels.extend(edge_labels)
+            targets.extend(children)
+            start.append(len(labels))
+            counts.append(count)
+            finals.append(final)
+            return len(counts) - 1
+
+        added = 0
+        for word in words:
+            b = word.encode("utf-8")
+            if b < prev:
+                raise ValueError(SORTED_INPUT_ERROR)
+            if b == prev and added > 0:
+                continue
+            n = min(len(prev), len(b))
+            k = 0
+            while k < n and prev[k] == b[k]:
+                k += 1
+            while len(stack) > k + 1:
+                frame = stack.pop()
+                parent = stack[-1]
+                parent[1] += frame[1]
+                parent[3].append(close(frame))
+            for byte in b[k:]:
+                stack[-1][2].append(byte)
+                stack.append([0, 0, bytearray(), []])
+            stack[-1][0] = 1
+            stack[-1][1] += 1
+            prev = b
+            added += 1
+
+        while len(stack) > 1:
+            frame = stack.pop()
+            parent = stack[-1]
+            parent[1] += frame[1]
+            parent[3].append(close(frame))
+        self.index = close(stack[0])
+
+        self.labels = labels
+        self.targets = targets
+        self.start = start
+        self.counts = counts
+        self.finals = finals
+        return added
+
+    def find_index(self, data, i):
+        '''
+        Walk down from node i along some bytes
+
+        Inputs:
+            data: (bytes) the bytes to follow
+            i: (int) the number of the starting node
+
+        Returns:
+            (int) the number of the node reached or NO_NODE
+        '''
+        labels = self.labels
+        targets = self.targets
+        start = self.start
+        for byte in data:
+            e = labels.find(byte, start[i], start[i + 1])
+            if e < 0:
+                return NO_NODE
+            i = targets[e]
+        return i
+
+    def _characters(self, head, i, remaining):
+        '''
+        Generate the (char, node) pairs reached from node i, in the middle
+        of a character whose first bytes are head, by following the
+        remaining bytes of the character.
+        '''
+        if remaining == 0:
+            yield head.decode("utf-8"), ByteNode(self, i)
+            return
+        labels = self.labels
+        targets = self.targets
+        for e in range(self.start[i], self.start[i + 1]):
+            yield from self._characters(head + bytes((labels[e],)),
+                                        targets[e], remaining - 1)
+
+    def __repr__(self):
+        return f'ByteTrie({len(self)} nodes, {self.count} words)'
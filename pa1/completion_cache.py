@@ -0,0 +1,145 @@
+# CS122: Auto-completing keyboard using Tries
+# Bounded LRU cache of completions
+#
+# Corry Ke
+#
+# A CachedDictionary wraps any EnglishDictionary and remembers the
+# answers of get_completions, num_completions and top_completions per
+# prefix, so a prefix that is asked about again (a repeated Tab, or the
+# short prefixes everyone types) costs a dictionary lookup.  The cache is
+# bounded by an estimate of the bytes its entries hold and evicts the
+# least recently used entries first.  It is emptied whenever the version
+# of the dictionary changes (see EnglishDictionary.add_word and
+# set_weight), so it never answers with completions of an older set of
+# words or weights.  Everything else is passed through to the wrapped
+# dictionary.
+
+import itertools
+import sys
+from collections import OrderedDict
+
+# the default budget of a cache, in bytes
+DEFAULT_MAX_BYTES = 16 * 1024 * 1024
+
+
+def _size(value):
+    '''
+    Estimate the bytes held by a cached answer
+    '''
+    n = sys.getsizeof(value)
+    if isinstance(value, list):
+        n += sum(sys.getsizeof(s) for s in value)
+    return n
+
+
+class CachedDictionary(object):
+    def __init__(self, eng_dict, max_bytes=DEFAULT_MAX_BYTES):
+        '''
+        Constructor
+
+        Inputs:
+            eng_dict: the dictionary to wrap
+            max_bytes: (int) the largest estimated size of the cached
+              answers, in bytes
+        '''
+        self._target = eng_dict
+        self.max_bytes = max_bytes
+        # (operation, arguments) -> (answer, size), least recently used first
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._version = getattr(eng_dict, "version", 0)
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __getattr__(self, name):
+        return getattr(self._target, name)
+
+    def _get(self, key):
+        '''
+        Look up a cached answer and mark it as recently used
+
+        Returns:
+            the answer, or None on a miss
+        '''
+        version = getattr(self._target, "version", 0)
+        if version != self._version:
+            self.clear()
+            self._version = version
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry[0]
+
+    def _put(self, key, value):
+        '''
+        Cache an answer, evicting the least recently used answers until
+        the cache is within its budget.  An answer larger than the whole
+        budget is not cached.
+        '''
+        size = _size(value) + sys.getsizeof(key[1])
+        if size > self.max_bytes:
+            return
+        self._entries[key] = (value, size)
+        self._bytes += size
+        while self._bytes > self.max_bytes:
+            _, (_, old_size) = self._entries.popitem(last=False)
+            self._bytes -= old_size
+            self.evictions += 1
+
+    def clear(self):
+        '''
+        Drop every cached answer
+        '''
+        self._entries.clear()
+        self._bytes = 0
+
+    def get_completions(self, prefix):
+        key = ("get_completions", prefix)
+        rv = self._get(key)
+        if rv is None:
+            rv = self._target.get_completions(prefix)
+            self._put(key, rv)
+        # the caller may change the list it gets
+        return list(rv)
+
+    def iter_completions(self, prefix, limit=None, offset=0):
+        rv = self._get(("get_completions", prefix))
+        if rv is None:
+            return self._target.iter_completions(prefix, limit, offset)
+        stop = None if limit is None else offset + limit
+        return itertools.islice(rv, offset, stop)
+
+    def num_completions(self, prefix):
+        key = ("num_completions", prefix)
+        rv = self._get(key)
+        if rv is None:
+            rv = self._target.num_completions(prefix)
+            self._put(key, rv)
+        return rv
+
+    def top_completions(self, prefix, k=None):
+        key = ("top_completions", (prefix, k))
+        rv = self._get(key)
+        if rv is None:
+            rv = self._target.top_completions(prefix, k)
+            self._put(key, rv)
+        return list(rv)
+
+    def cache_stats(self):
+        '''
+        Get the hit and miss counts and the size of the cache
+
+        Returns:
+            (dict) hits, misses, hit_rate, evictions, entries and bytes
+        '''
+        lookups = self.hits + self.misses
+        return {"hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "entries": len(self._entries),
+                "bytes": self._bytes}
@@ -0,0 +1,211 @@
+# CS122: Auto-completing keyboard using Tries
+# Directed acyclic word graph (minimized trie)
+#
+# Corry Ke
+#
+# A DAWG is a trie in which equivalent subtries (same final flag, same
+# edges to the same children) are stored once, so common suffixes such
+# as "-ness" and "-ation" are shared by every word that ends with them.
+# It is built incrementally from sorted words (Daciuk et al., 2000):
+# only the path of the most recent word can still change, and whenever
+# a new word leaves that path the nodes below the fork are frozen and
+# replaced by an equivalent node from the register, if there is one.
+
+SORTED_INPUT_ERROR = "words must be added to a DAWG in sorted order"
+
+
+class DawgNode(object):
+    __slots__ = ('edges', 'final', 'count')
+
+    def __init__(self):
+        '''
+        Constructor
+
+        Inputs:
+            None
+        '''
+        self.edges = {}
+        self.final = False
+        # number of words (paths to a final node) from this node,
+        # filled in when the node is frozen
+        self.count = 0
+
+    def signature(self):
+        '''
+        The key of the node in the register.  Children are frozen before
+        their parents, so two nodes are equivalent exactly when their
+        signatures are equal.
+        '''
+        return (self.final,
+                tuple((char, id(child)) for char, child in self.edges.items()))
+
+    def find(self, prefix):
+        '''
+        Walk down from this node along the characters of prefix
+
+        Inputs:
+            prefix: (string) the characters to follow
+
+        Returns:
+            (DawgNode) the node reached, or None if prefix leaves the graph
+        '''
+        node = self
+        for char in prefix:
+            node = node.edges.get(char)
+            if node is None:
+                return None
+        return node
+
+    def child(self, char):
+        '''
+        Get the child reached from this node by char, or None
+        '''
+        return self.edges.get(char)
+
+    def children(self):
+        '''
+        Get the (char, child) pairs of this node in sorted order
+        '''
+        return self.edges.items()
+
+
+class Dawg(object):
+    '''
+    A DAWG built from words added in sorted order.  It can be used
+    wherever a root TrieNode is; the first query freezes the graph, and
+    no words can be added after that.
+    '''
+    # EnglishDictionary sorts the words of the word file for this backend
+    SORTED_INPUT = True
+
+    def __init__(self):
+        '''
+        Constructor: build an empty DAWG.
+        '''
+        self.root = DawgNode()
+        self.previous = None
+        # the (parent, char, child) edges of the path of the last word
+        # that have not been checked against the register yet
+        self.unchecked = []
+        self.register = {}
+        self.frozen = False
+
+    def add_word(self, word):
+        '''
+        Add a word, which must not sort before any word added already
+
+        Inputs:
+            word: (string) the word
+
+        Returns:
+            (bool) False if the word was the last word added, True otherwise
+        '''
+        if self.frozen:
+            raise ValueError("cannot add words to a frozen DAWG")
+        previous = self.previous
+        if previous is not None:
+            if word == previous:
+                return False
+            if word < previous:
+                raise ValueError(SORTED_INPUT_ERROR)
+            n = min(len(word), len(previous))
+            common = 0
+            while common < n and word[common] == previous[common]:
+                common += 1
+        else:
+            common = 0
+
+        self._minimize(common)
+        if self.unchecked:
+            node = self.unchecked[-1][2]
+        else:
+            node = self.root
+        for char in word[common:]:
+            child = DawgNode()
+            node.edges[char] = child
+            self.unchecked.append((node, char, child))
+            node = child
+        node.final = True
+        self.previous = word
+        return True
+
+    def add_words(self, words):
+        '''
+        Add many words, in sorted order
+
+        Inputs:
+            words: (iterable of strings) the sorted words
+
+        Returns:
+            (int) the number of words added
+        '''
+        add_word = self.add_word
+        return sum(1 for w in words if add_word(w))
+
+    def _minimize(self, down_to):
+        '''
+        Freeze the unchecked nodes deeper than down_to, replacing each by
+        an equivalent registered node when there is one.
+        '''
+        unchecked = self.unchecked
+        register = self.register
+        while len(unchecked) > down_to:
+            parent, char, child = unchecked.pop()
+            _set_count(child)
+            sig = child.signature()
+            same = register.get(sig)
+            if same is None:
+                register[sig] = child
+            else:
+                parent.edges[char] = same
+
+    def freeze(self):
+        '''
+        Minimize the path of the last word and drop the register.  Called
+        by the first query.
+        '''
+        if not self.frozen:
+            self._minimize(0)
+            _set_count(self.root)
+            self.register = None
+            self.frozen = True
+
+    def __len__(self):
+        '''
+        The number of distinct nodes in the DAWG, including the root
+        '''
+        self.freeze()
+        seen = {id(self.root)}
+        stack = [self.root]
+        while stack:
+            for child in stack.pop().edges.values():
+                if id(child) not in seen:
+                    seen.add(id(child))
+                    stack.append(child)
+        return len(seen)
+
+    @property
+    def count(self):
+        self.freeze()
+        return self.root.count
+
+    @property
+    def final(self):
+        return self.root.final
+
+    def find(self, prefix):
+        self.freeze()
+        return self.root.find(prefix)
+
+    def child(self, char):
+        self.freeze()
+        return self.root.child(char)
+
+    def children(self):
+        self.freeze()
+        return self.root.children()
+
+
+def _set_count(node):
+    node.count = int(node.final) + sum(child.count
+                                       for child in node.edges.values())
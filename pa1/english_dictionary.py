@@ -9,28 +9,157 @@
 #
 # Corry Ke 
 
+import gc
 import os
 import sys
+import unicodedata
 from sys import exit
 
 import autocorrect_shell
+import array_trie
+import byte_trie
+import dawg
+import radix_trie
+import trie_snapshot
+import ranked_completions
+import fuzzy_search
+import normalization
+import word_log
+
+# the number of logged changes between two compactions
+DEFAULT_COMPACT_EVERY = 10000
+
+
+def read_words(f, normalizer=None):
+    '''
+    Generate the words of an open word file, one per non-blank line
+
+    Inputs:
+        f: (file) the open word file
+        normalizer: (Normalizer) applied to every word, or None
+
+    Returns:
+        generator of strings
+    '''
+    for w in f:
+        w = w.strip()
+        if normalizer is not None:
+            w = normalizer(w)
+        if w != "":
+            yield w
 
 
 class EnglishDictionary(object):
-    def __init__(self, wordfile):
+    # can the words be loaded from a snapshot file?
+    SNAPSHOTS = True
+
+    def __init__(self, wordfile, backend=None, snapshot=None,
+                 freqfile=None, top_k=ranked_completions.DEFAULT_TOP_K,
+                 log=None, compact_every=DEFAULT_COMPACT_EVERY,
+                 normalize=None, workers=None):
         '''
         Constructor
 
         Inputs:
           wordfile (string): name of the file with the words.
+          backend (string): "trie" for a trie of TrieNode objects,
+            "array" for the compact array-backed trie, "radix" for a
+            path-compressed trie, "bytes" for the read-only trie with
+            UTF-8 byte edges or "dawg" for a minimized directed acyclic
+            word graph; None for "array" if there is a snapshot, and
+            "trie" otherwise.
+          snapshot (string): name of a snapshot file for the "array"
+            backend.  The trie is memory-mapped from the snapshot, which
+            is (re)built first if it is missing or older than wordfile.
+          freqfile (string): name of a file of "word weight" lines used
+            to rank completions, or None.
+          top_k (int): the number of ranked completions cached per prefix.
+          log (string): name of a file that records the words added and
+            removed with add_word and remove_word.  The changes in it are
+            replayed on top of wordfile (or the snapshot) when the
+            dictionary is loaded.
+          compact_every (int): the number of logged changes after which
+            compact is called, or None to compact only when asked.
+          normalize (string): the normalization applied to the words
+            and to every query, as a normalization.Normalizer or a spec
+            such as "NFKC,casefold,strip_accents"; None for none.
+            Completions are suffixes of the normalized words.
+          workers (int): build the "array" backend (or its snapshot)
+            with this many processes, each building the words with some
+            of the first characters; None for a serial build.
         '''
-        self.words = TrieNode()
-
-        with open(wordfile) as f:
-            for w in f:
-                w = w.strip()
-                if w != "" and not self.is_word(w):
-                    self.words.add_word(w)
+        if backend is None:
+            backend = "trie" if snapshot is None else "array"
+        if backend not in BACKENDS:
+            raise ValueError("unknown trie backend: %s" % backend)
+        self.normalizer = normalization.get_normalizer(normalize)
+        if workers is not None and backend != "array":
+            raise ValueError("parallel builds need the array backend")
+        if workers is not None and workers < 1:
+            raise ValueError("a parallel build needs at least one worker")
+
+        if snapshot is not None:
+            if backend != "array":
+                raise ValueError("snapshots need the array backend")
+            self.words = trie_snapshot.load_or_build(wordfile, snapshot,
+                                                     self.normalizer, workers)
+        elif workers is not None:
+            # multiprocessing is slow to import, and only needed here
+            import parallel_build
+            self.words = parallel_build.build(wordfile, workers,
+                                              self.normalizer)
+        else:
+            self.words = BACKENDS[backend]()
+            # the build only allocates objects that stay alive, so the
+            # cycle collector would scan the growing trie for nothing
+            gc_was_enabled = gc.isenabled()
+            gc.disable()
+            try:
+                with open(wordfile, encoding="utf-8") as f:
+                    words = read_words(f, self.normalizer)
+                    if getattr(self.words, "SORTED_INPUT", False):
+                        words = sorted(set(words))
+                    self.words.add_words(words)
+            finally:
+                if gc_was_enabled:
+                    gc.enable()
+
+        self.wordfile = wordfile
+        self.snapshot = snapshot
+        # incremented by every change, so that caches can tell they are stale
+        self.version = 0
+        self.log = None
+        self.compact_every = compact_every
+        if log is not None:
+            self._check_mutable()
+            for op, word in word_log.read_log(log):
+                if op == word_log.ADD:
+                    self.words.add_word(word)
+                else:
+                    self.words.remove_word(word)
+            self.log = word_log.WordLog(log)
+
+        self.top_k = top_k
+        self.ranked = None
+        if freqfile is not None:
+            weights = ranked_completions.read_weights(freqfile)
+            if self.normalizer is not None:
+                # the weights of the spellings of a word add up
+                normalized = {}
+                for w, weight in weights.items():
+                    w = self.normalizer(w)
+                    normalized[w] = normalized.get(w, 0) + weight
+                weights = normalized
+            self.ranked = ranked_completions.RankedCompletions(
+                self, weights, top_k)
+
+    def _key(self, s):
+        '''
+        The form of a word or prefix that is looked up in the trie
+        '''
+        if self.normalizer is None:
+            return s
+        return self.normalizer(s)
 
     def is_word(self, w):
         '''
@@ -41,29 +170,8 @@ class EnglishDictionary(object):
 
         Returns: boolean
         '''
-        return self.is_word_helper(w, self.words, 0)
-    
-    def is_word_helper(self, w, node, i):
-        '''
-        Recursive helper that determines whether a complete
-        word ends on this node
-
-        Inputs:
-            w: (str) the word of interest
-            node: (TrieNode) the cuurent node
-            i: (int) the index that keeps track of our position in the word
-        
-        Returns:
-            (bool) whether a word ended on a node
-        '''
-
-        if i == len(w):
-            return node.final
-        char = w[i]
-        if char in node.sub:
-            return self.is_word_helper(w, node.sub[char], i + 1)
-        return False
-
+        node = self.words.find(self._key(w))
+        return node is not None and node.final
 
     def num_completions(self, prefix):
         '''
@@ -75,33 +183,38 @@ class EnglishDictionary(object):
 
         Returns: int
         '''
-        return self.num_completions_r(self.words, prefix, 0)
+        node = self.words.find(self._key(prefix))
+        if node is None:
+            return 0
+        return node.count
 
+    def is_word_many(self, tokens):
+        '''
+        Which of many strings are words?  The batch is de-duplicated and
+        walked in sorted order, so it is much faster than calling
+        is_word on every token.
+
+        Inputs:
+          tokens (sequence of strings): the strings to check
+
+        Returns: numpy array of booleans
+        '''
+        # numpy is only needed by the batch queries, not by the shell
+        import batch_queries
+        return batch_queries.is_word_many(self, tokens)
 
-    def num_completions_r(self, trie, prefix, i):
+    def num_completions_many(self, prefixes):
         '''
-        Recursive helper that gives the word count of a prefix
-        node.
+        How many words start with each of many prefixes?
 
         Inputs:
-            trie: (TrieNode) the current TrieNode
-            prefix: (str) a string of prefix
-            i: (int) the index that keeps track of our position in the prefix
-        
-        Returns:
-            (int) number of words in the Trie that begins with prefix
+          prefixes (sequence of strings): the prefixes
+
+        Returns: numpy array of ints
         '''
-        
-        if i == len(prefix):
-            return trie.count
-        
-        char = prefix[i]
-        if char in trie.sub:
-            return self.num_completions_r(trie.sub[char], prefix, i + 1)
-        else:
-            return 0
+        import batch_queries
+        return batch_queries.num_completions_many(self, prefixes)
 
-        
     def get_completions(self, prefix):
         '''
         Get the suffixes in the dictionary of words that start with the
@@ -112,53 +225,373 @@ class EnglishDictionary(object):
 
         Returns: list of strings.
         '''
+        return list(self.iter_completions(prefix))
 
-        suffs = self.get_completion_node(self.words, prefix, 0)
-        return [suff for suff in suffs if suff]
-    
-    def get_completion_node(self, parent, prefix, i):
+    def iter_completions(self, prefix, limit=None, offset=0):
         '''
-        A helper that recursively navigates the subtrie to get 
-        to children nodes of a parent
-        
+        Generate the suffixes of the words that start with the specified
+        prefix, in the same order as get_completions, without building
+        the whole list.  The empty suffix is included when the prefix is
+        itself a word.
+
         Inputs:
-            parent: (TrieNode) the current, parent TrieNode
-            prefix: (string) the prefix of interest
-            i: (int) index that keeps track of the posistion of 
+          prefix (string): the prefix
+          limit (int): the largest number of suffixes to generate, or
+            None for no limit
+          offset (int): the number of suffixes to skip first
 
-        Returns: 
-            (lst) a list of all suffixes following a prefix 
+        Returns: generator of strings
         '''
-        if i == len(prefix):
-            return self.get_completion_suffix(parent)
+        node = self.words.find(self._key(prefix))
+        if node is None:
+            return iter(())
+        return self.iter_completion_suffix(node, limit, offset)
 
-        char = prefix[i]
-        if char in parent.sub:
-            return self.get_completion_node(parent.sub[char], prefix, i + 1)
+    def top_completions(self, prefix, k=None):
+        '''
+        Get the suffixes of the best completions of a prefix, ranked by
+        word frequency.  Without a frequency file, these are the first
+        completions in get_completions order.
 
-        return []
+        Inputs:
+          prefix (string): the prefix
+          k (int): the number of completions, at most top_k (the default)
 
+        Returns: list of strings, best first
+        '''
+        if k is None or k > self.top_k:
+            k = self.top_k
+        if self.ranked is None:
+            return list(self.iter_completions(prefix, limit=k))
+        return self.ranked.top_completions(self._key(prefix), k)
+
+    def cursor(self):
+        '''
+        Get a PrefixCursor that follows a word as it is typed
 
-    def get_completion_suffix(self, parent):
+        Returns: PrefixCursor
         '''
-        A recursive helper that gathers all the suffix of a
-        parent(prefix) node.
+        return PrefixCursor(self)
+
+    def set_weight(self, word, weight):
+        '''
+        Change the frequency weight of a word.  Only the cached ranked
+        completions of the prefixes of the word are recomputed.
+
+        Inputs:
+          word (string): a word of the dictionary
+          weight (float): its new weight
+
+        Returns: None
+        '''
+        if self.ranked is None:
+            self.ranked = ranked_completions.RankedCompletions(
+                self, {}, self.top_k)
+        self.ranked.set_weight(self._key(word), weight)
+        self.version += 1
+
+    def add_word(self, word):
+        '''
+        Add a word to the live dictionary.  The change is in the log, if
+        there is one, when the call returns.
+
+        Inputs:
+          word (string): the word, without surrounding whitespace
+
+        Returns: boolean, False if the word was already in the dictionary
+        '''
+        self._check_mutable()
+        word = self._key(word)
+        _check_word(word)
+        added = self.words.add_word(word)
+        if added:
+            self._changed(word_log.ADD, word)
+        return added
+
+    def remove_word(self, word):
+        '''
+        Remove a word from the live dictionary.  Cursors that were inside
+        the word should be reset.
+
+        Inputs:
+          word (string): the word
+
+        Returns: boolean, True if the word was in the dictionary
+        '''
+        self._check_mutable()
+        word = self._key(word)
+        removed = self.words.remove_word(word)
+        if removed:
+            self._changed(word_log.REMOVE, word)
+        return removed
+
+    def _check_mutable(self):
+        if not hasattr(self.words, "remove_word"):
+            raise ValueError("words cannot be added to or removed from "
+                             "this backend")
+
+    def _changed(self, op, word):
+        '''
+        Bring the ranked completions and the log up to date with a change
+        '''
+        self.version += 1
+        if self.ranked is not None:
+            if op == word_log.REMOVE:
+                self.ranked.remove_word(word)
+            else:
+                self.ranked.repair(word)
+        if self.log is not None:
+            self.log.append(op, word)
+            if (self.compact_every is not None
+                    and self.log.appended >= self.compact_every):
+                self.compact()
+
+    def compact(self):
+        '''
+        Shrink the log to the last change of each word and, when the
+        dictionary has a snapshot, rebuild the trie without the nodes
+        left behind by removed words and write it to the snapshot, so
+        the next load does not depend on a long log.
+
+        Returns: None
+        '''
+        if self.snapshot is not None:
+            trie = array_trie.ArrayTrie()
+            trie.add_words(self.iter_completions(""))
+            trie_snapshot.write_snapshot(trie, self.wordfile, self.snapshot,
+                                         self.normalizer)
+            self.words = trie
+        if self.log is not None:
+            self.log.compact()
+
+    def close(self):
+        '''
+        Close the log
+        '''
+        if self.log is not None:
+            self.log.close()
+            self.log = None
+
+    def fuzzy_versions(self, word, max_cost=2, limit=None):
+        '''
+        Find the words that are "near" a possibly misspelled word: within
+        max_cost edits, where a substitution by a neighbouring key on the
+        keyboard counts as half an edit.
 
         Inputs:
-            parent: (TrieNode) the current node
+          word (string): the word to correct
+          max_cost (float): the largest edit distance allowed
+          limit (int): the largest number of words returned, or None
+
+        Returns: list of strings, closest first
+        '''
+        return fuzzy_search.fuzzy_versions(self.words, self._key(word),
+                                           max_cost, limit)
+
+    def iter_completion_suffix(self, parent, limit, offset):
+        '''
+        An iterative helper that generates the suffixes of the words
+        under a parent(prefix) node.  The depth-first walk keeps its
+        own stack of child iterators and the edge labels on the current
+        path (characters, or whole strings in a radix trie), and joins
+        them only when a word is emitted.  Subtries that fall entirely
+        inside the offset are skipped using their counts.
+
+        Inputs:
+            parent: (TrieNode) the prefix node
+            limit: (int) the largest number of suffixes or None
+            offset: (int) the number of suffixes to skip
 
         Returns:
-            (lst) A list of all suffixes from that parent node
+            generator of strings
+        '''
+        if offset >= parent.count or (limit is not None and limit <= 0):
+            return
+        skip = offset
+        remaining = limit
+        if parent.final:
+            if skip > 0:
+                skip -= 1
+            else:
+                yield ''
+                if remaining is not None:
+                    remaining -= 1
+                    if remaining == 0:
+                        return
+
+        path = []
+        stack = [iter(parent.children())]
+        while stack:
+            for label, child in stack[-1]:
+                if skip >= child.count:
+                    skip -= child.count
+                    continue
+                path.append(label)
+                if child.final:
+                    if skip > 0:
+                        skip -= 1
+                    else:
+                        yield ''.join(path)
+                        if remaining is not None:
+                            remaining -= 1
+                            if remaining == 0:
+                                return
+                stack.append(iter(child.children()))
+                break
+            else:
+                stack.pop()
+                if path:
+                    path.pop()
+
+
+def _check_word(word):
+    '''
+    Make sure a string can be a word: one line of a word file.
+    '''
+    if not isinstance(word, str) or word == "" or word != word.strip():
+        raise ValueError("not a word: %r" % (word,))
+
+
+class PrefixCursor(object):
+    '''
+    The position of a word that is being typed, one character at a time,
+    in an EnglishDictionary.  The cursor keeps the trie node of every
+    prefix of the word, so typing or erasing a character costs one step
+    in the trie however long the word is.
+    '''
+    __slots__ = ('eng_dict', 'nodes', 'chars', 'widths', 'dead')
+
+    def __init__(self, eng_dict):
         '''
-        if not parent.sub: 
-            return ['']
+        Constructor
 
-        complete = []
-        for char, child in parent.sub.items():
-            child_suff = self.get_completion_suffix(child)
-            complete.extend([char + suff for suff in child_suff])
+        Inputs:
+            eng_dict: (EnglishDictionary) the dictionary to follow
+        '''
+        self.eng_dict = eng_dict
+        self.reset()
 
-        return complete
+    def reset(self):
+        '''
+        Go back to the empty prefix
+        '''
+        self.nodes = [self.eng_dict.words]
+        self.chars = []
+        # the number of trie steps of each character, which is not 1
+        # when the dictionary normalizes it to another length
+        self.widths = []
+        # the number of trailing steps that left the trie
+        self.dead = 0
+
+    def _walk(self, steps):
+        for c in steps:
+            if self.dead == 0:
+                child = self.nodes[-1].child(c)
+                if child is not None:
+                    self.nodes.append(child)
+                    continue
+            self.dead += 1
+
+    def _rewalk(self):
+        '''
+        Walk the trie again from the root with the whole prefix
+        normalized at once
+
+        Returns: the number of steps
+        '''
+        steps = self.eng_dict.normalizer(self.prefix)
+        self.nodes = [self.eng_dict.words]
+        self.dead = 0
+        self._walk(steps)
+        return len(steps)
+
+    def advance(self, char):
+        '''
+        Add one character to the end of the prefix.  The dictionary's
+        normalization is applied to the character on its own, except
+        for a combining mark, which can change the character before it
+        (e and U+0301 are é in NFC): the whole prefix is normalized
+        again.
+
+        Inputs:
+            char: (str) the character typed
+        '''
+        self.chars.append(char)
+        normalizer = self.eng_dict.normalizer
+        if normalizer is not None and unicodedata.combining(char):
+            self.widths.append(self._rewalk() - sum(self.widths))
+            return
+        steps = char if normalizer is None else normalizer(char)
+        self.widths.append(len(steps))
+        self._walk(steps)
+
+    def back(self):
+        '''
+        Remove the last character of the prefix, if there is one
+        '''
+        if not self.chars:
+            return
+        char = self.chars.pop()
+        width = self.widths.pop()
+        if (self.eng_dict.normalizer is not None
+                and unicodedata.combining(char)):
+            self._rewalk()
+            return
+        for _ in range(width):
+            if self.dead > 0:
+                self.dead -= 1
+            else:
+                self.nodes.pop()
+
+    @property
+    def prefix(self):
+        return ''.join(self.chars)
+
+    @property
+    def node(self):
+        '''
+        The trie node of the prefix, or None if no word starts with it
+        '''
+        if self.dead > 0:
+            return None
+        return self.nodes[-1]
+
+    def is_word(self):
+        '''
+        Is the prefix a word?
+
+        Returns: boolean
+        '''
+        node = self.node
+        return node is not None and node.final
+
+    def num_completions(self):
+        '''
+        How many words start with the prefix?
+
+        Returns: int
+        '''
+        node = self.node
+        if node is None:
+            return 0
+        return node.count
+
+    def iter_completions(self, limit=None, offset=0):
+        '''
+        Generate the suffixes of the words that start with the prefix,
+        like EnglishDictionary.iter_completions.
+
+        Inputs:
+          limit (int): the largest number of suffixes to generate, or
+            None for no limit
+          offset (int): the number of suffixes to skip first
+
+        Returns: generator of strings
+        '''
+        node = self.node
+        if node is None:
+            return iter(())
+        return self.eng_dict.iter_completion_suffix(node, limit, offset)
 
 
 class TrieNode(object):
@@ -184,7 +617,7 @@ class TrieNode(object):
             i: (int) index used to extract the exact letter of word
         
         Returns:
-            None 
+            (bool) False if the word was already in the trie, True otherwise
         '''
         if i < len(word):
             char = word[i]
@@ -193,12 +626,15 @@ class TrieNode(object):
                 self.sub[char] = t
             else:
                 t = self.sub[char]
-            t._add_word_helper(word, i+1)
+            added = t._add_word_helper(word, i+1)
 
         else:
+            added = not self.final
             self.final = True
 
-        self.count += 1
+        if added:
+            self.count += 1
+        return added
             
     def add_word(self, word):
         '''
@@ -209,9 +645,121 @@ class TrieNode(object):
             word: (string) the complete word we are adding to the trie
 
         Returns:
-            None 
+            (bool) False if the word was already in the trie, True otherwise
+        '''
+        return self._add_word_helper(word, 0)
+
+    def add_words(self, words):
+        '''
+        Add many words with one iterative walk per word.  Each walk
+        starts where the previous word's path forks off, so sorted input
+        only visits the new suffix of each word, and once a character is
+        missing the rest of the word is added without further lookups.
+        Words already in the trie are skipped.
+
+        Inputs:
+            words: (iterable of strings) the words to add
+
+        Returns:
+            (int) the number of words that were not in the trie yet
+        '''
+        added = 0
+        prev = ''
+        path = [self]
+        for word in words:
+            n = min(len(prev), len(word))
+            k = 0
+            while k < n and prev[k] == word[k]:
+                k += 1
+            del path[k + 1:]
+
+            node = path[k]
+            for i in range(k, len(word)):
+                child = node.sub.get(word[i])
+                if child is None:
+                    break
+                path.append(child)
+                node = child
+            else:
+                i = len(word)
+            for char in word[i:]:
+                child = TrieNode()
+                node.sub[char] = child
+                path.append(child)
+                node = child
+
+            prev = word
+            if not node.final:
+                node.final = True
+                for p in path:
+                    p.count += 1
+                added += 1
+        return added
+
+    def remove_word(self, word):
+        '''
+        Remove a word from the trie, dropping the branch that held
+        only this word.
+
+        Inputs:
+            word: (string) the word to remove
+
+        Returns:
+            (bool) True if the word was in the trie, False otherwise
+        '''
+        path = [self]
+        node = self
+        for char in word:
+            node = node.sub.get(char)
+            if node is None:
+                return False
+            path.append(node)
+        if not node.final:
+            return False
+
+        node.final = False
+        for p in path:
+            p.count -= 1
+        for i in range(1, len(path)):
+            if path[i].count == 0:
+                del path[i - 1].sub[word[i - 1]]
+                break
+        return True
+
+    def find(self, prefix):
+        '''
+        Walk down the trie from this node along the characters of prefix
+
+        Inputs:
+            prefix: (string) the characters to follow
+
+        Returns:
+            (TrieNode) the node reached, or None if prefix leaves the trie
+        '''
+        node = self
+        for char in prefix:
+            node = node.sub.get(char)
+            if node is None:
+                return None
+        return node
+
+    def child(self, char):
+        '''
+        Get the child reached from this node by char
+
+        Inputs:
+            char: (str) a single character
+
+        Returns:
+            (TrieNode) the child, or None if there is no such edge
         '''
-        self._add_word_helper(word, 0)
+        return self.sub.get(char)
+
+    def children(self):
+        '''
+        Get the (char, child) pairs of this node in insertion order
+        '''
+        return self.sub.items()
         
         
     def __repr__(self):
@@ -222,6 +770,13 @@ class TrieNode(object):
         return ret
 
 
+BACKENDS = {"trie": TrieNode,
+            "array": array_trie.ArrayTrie,
+            "radix": radix_trie.RadixNode,
+            "bytes": byte_trie.ByteTrie,
+            "dawg": dawg.Dawg}
+
+
 if __name__ == "__main__":
     autocorrect_shell.go("english_dictionary")
 
@@ -0,0 +1,27 @@
+# CS122: Auto-completing keyboard using Tries
+# DAWG implementation of the EnglishDictionary class
+#
+# Corry Ke
+
+import autocorrect_shell
+import english_dictionary
+
+
+class EnglishDictionary(english_dictionary.EnglishDictionary):
+    SNAPSHOTS = False
+
+    def __init__(self, wordfile, **options):
+        '''
+        Constructor: load the words into a minimized DAWG instead of a
+        trie.  The queries are those of english_dictionary.EnglishDictionary.
+
+        Inputs:
+          wordfile (string): name of the file with the words.
+          options: other keyword arguments of the base constructor,
+            such as freqfile.
+        '''
+        super().__init__(wordfile, backend="dawg", **options)
+
+
+if __name__ == "__main__":
+    autocorrect_shell.go("english_dictionary_dawg")
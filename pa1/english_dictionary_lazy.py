@@ -0,0 +1,203 @@
+# CS122: Auto-completing keyboard using Tries
+# Lazily loaded implementation of the EnglishDictionary class
+#
+# Corry Ke
+#
+# The constructor returns at once and a background thread loads the
+# words, one first-letter chunk at a time: it reads the word file once,
+# splitting the words by their first character, then builds a subtrie
+# per character and hangs it under the root.  A query waits only for the
+# chunk its prefix falls in, and the loader builds the chunks that
+# queries are waiting for before the others, so the shell can show its
+# prompt immediately.  Keys typed while a chunk is loading wait in the
+# terminal's input buffer and are answered as soon as it is ready.  The
+# empty prefix, fuzzy search and changes to the dictionary wait for all
+# of the chunks.
+#
+# Usage:
+#   python3 english_dictionary_lazy.py WORD_FILE
+
+import gc
+import os
+import threading
+
+import autocorrect_shell
+import english_dictionary
+import ranked_completions
+
+
+class EnglishDictionary(english_dictionary.EnglishDictionary):
+    SNAPSHOTS = False
+
+    def __init__(self, wordfile, top_k=ranked_completions.DEFAULT_TOP_K):
+        '''
+        Constructor: start loading the words in the background
+
+        Inputs:
+          wordfile (string): name of the file with the words.
+          top_k (int): the number of completions of top_completions.
+        '''
+        # an empty dictionary of TrieNodes, filled in by the loader
+        super().__init__(os.devnull, top_k=top_k)
+        self.wordfile = wordfile
+        self._lock = threading.Condition()
+        # first character -> words, once the word file has been read
+        self._chunks = None
+        # first characters whose chunk a query is waiting for
+        self._wanted = []
+        self._done = set()
+        self._loaded = False
+        self._error = None
+        threading.Thread(target=self._load, daemon=True).start()
+
+    def _load(self):
+        '''
+        Read the word file and build its chunks, wanted chunks first
+        '''
+        try:
+            chunks = {}
+            with open(self.wordfile, encoding="utf-8") as f:
+                for w in english_dictionary.read_words(f):
+                    chunk = chunks.get(w[0])
+                    if chunk is None:
+                        chunks[w[0]] = [w]
+                    else:
+                        chunk.append(w)
+            order = list(chunks)
+            with self._lock:
+                self._chunks = chunks
+                self._lock.notify_all()
+
+            gc_was_enabled = gc.isenabled()
+            gc.disable()
+            try:
+                while True:
+                    with self._lock:
+                        pending = [c for c in self._wanted
+                                   if c not in self._done]
+                        if not pending:
+                            pending = [c for c in order if c not in self._done]
+                        if not pending:
+                            break
+                        char = pending[0]
+                    self._build_chunk(char, chunks[char])
+            finally:
+                if gc_was_enabled:
+                    gc.enable()
+
+            # the root's children in the order of a serial build
+            root = self.words
+            root.sub = {c: root.sub[c] for c in order}
+        except Exception as e:
+            self._error = e
+        with self._lock:
+            self._loaded = True
+            self._lock.notify_all()
+
+    def _build_chunk(self, char, words):
+        '''
+        Build the subtrie of the words that start with char and attach it
+        to the root
+        '''
+        subtrie = english_dictionary.TrieNode()
+        subtrie.add_words(words)
+        node = subtrie.sub[char]
+        root = self.words
+        with self._lock:
+            root.sub[char] = node
+            root.count += node.count
+            self._done.add(char)
+            self._lock.notify_all()
+
+    def wait_for(self, prefix):
+        '''
+        Wait until the words that start with prefix are loaded
+
+        Inputs:
+          prefix (string): the prefix; "" waits for every word
+        '''
+        if self._loaded:
+            if self._error is not None:
+                raise self._error
+            return
+        with self._lock:
+            if prefix == "":
+                self._lock.wait_for(lambda: self._loaded)
+            else:
+                char = prefix[0]
+                self._wanted.append(char)
+                self._lock.wait_for(
+                    lambda: self._loaded or char in self._done
+                    or (self._chunks is not None and char not in self._chunks))
+        if self._error is not None:
+            raise self._error
+
+    def is_word(self, w):
+        self.wait_for(w)
+        return super().is_word(w)
+
+    def num_completions(self, prefix):
+        self.wait_for(prefix)
+        return super().num_completions(prefix)
+
+    def iter_completions(self, prefix, limit=None, offset=0):
+        self.wait_for(prefix)
+        return super().iter_completions(prefix, limit, offset)
+
+    def top_completions(self, prefix, k=None):
+        self.wait_for(prefix)
+        return super().top_completions(prefix, k)
+
+    def is_word_many(self, tokens):
+        self.wait_for("")
+        return super().is_word_many(tokens)
+
+    def num_completions_many(self, prefixes):
+        self.wait_for("")
+        return super().num_completions_many(prefixes)
+
+    def fuzzy_versions(self, word, max_cost=2, limit=None):
+        self.wait_for("")
+        return super().fuzzy_versions(word, max_cost, limit)
+
+    def add_word(self, word):
+        self.wait_for("")
+        return super().add_word(word)
+
+    def remove_word(self, word):
+        self.wait_for("")
+        return super().remove_word(word)
+
+    def set_weight(self, word, weight):
+        self.wait_for("")
+        super().set_weight(word, weight)
+
+    def cursor(self):
+        return LazyCursor(self)
+
+
+class LazyCursor(english_dictionary.PrefixCursor):
+    '''
+    A PrefixCursor that waits for the chunk of the first character
+    before leaving the root
+    '''
+    __slots__ = ()
+
+    def advance(self, char):
+        if not self.chars:
+            self.eng_dict.wait_for(char)
+        super().advance(char)
+
+    def num_completions(self):
+        if not self.chars:
+            self.eng_dict.wait_for("")
+        return super().num_completions()
+
+    def iter_completions(self, limit=None, offset=0):
+        if not self.chars:
+            self.eng_dict.wait_for("")
+        return super().iter_completions(limit, offset)
+
+
+if __name__ == "__main__":
+    autocorrect_shell.go("english_dictionary_lazy")
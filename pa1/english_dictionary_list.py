@@ -11,6 +11,7 @@
 import os
 import sys
 from sys import exit
+import itertools
 import autocorrect_shell
 
 
@@ -72,6 +73,22 @@ class EnglishDictionary(object):
         '''
         return [w[len(prefix):] for w in self.words if w.startswith(prefix)]
 
+    def iter_completions(self, prefix, limit=None, offset=0):
+        '''
+        Generate the suffixes returned by get_completions lazily.
+
+        Inputs:
+          prefix (string): the prefix
+          limit (int): the largest number of suffixes to generate, or
+            None for no limit
+          offset (int): the number of suffixes to skip first
+
+        Returns: generator of strings
+        '''
+        suffs = (w[len(prefix):] for w in self.words if w.startswith(prefix))
+        stop = None if limit is None else offset + max(limit, 0)
+        return itertools.islice(suffs, offset, stop)
+
 
 if __name__ == "__main__":
     autocorrect_shell.go("english_dictionary_list")
@@ -0,0 +1,28 @@
+# CS122: Auto-completing keyboard using Tries
+# Radix trie implementation of the EnglishDictionary class
+#
+# Corry Ke
+
+import autocorrect_shell
+import english_dictionary
+
+
+class EnglishDictionary(english_dictionary.EnglishDictionary):
+    SNAPSHOTS = False
+
+    def __init__(self, wordfile, **options):
+        '''
+        Constructor: load the words into a path-compressed radix trie,
+        in which chains of single-child nodes are one edge.  The queries
+        are those of english_dictionary.EnglishDictionary.
+
+        Inputs:
+          wordfile (string): name of the file with the words.
+          options: other keyword arguments of the base constructor,
+            such as freqfile.
+        '''
+        super().__init__(wordfile, backend="radix", **options)
+
+
+if __name__ == "__main__":
+    autocorrect_shell.go("english_dictionary_radix")
@@ -0,0 +1,34 @@
+# CS122: Auto-completing keyboard using Tries
+# Unicode-aware implementation of the EnglishDictionary class
+#
+# Corry Ke
+
+import autocorrect_shell
+import english_dictionary
+
+# the normalization used unless another one is given
+DEFAULT_NORMALIZATION = "NFKC,casefold"
+
+
+class EnglishDictionary(english_dictionary.EnglishDictionary):
+    SNAPSHOTS = False
+
+    def __init__(self, wordfile, **options):
+        '''
+        Constructor: load the words, normalized and case folded, into the
+        trie with UTF-8 byte edges.  The queries are those of
+        english_dictionary.EnglishDictionary, and are normalized the same
+        way, so "Apple" completes like "apple".
+
+        Inputs:
+          wordfile (string): name of the file with the words (UTF-8).
+          options: other keyword arguments of the base constructor,
+            such as normalize or freqfile.
+        '''
+        options.setdefault("backend", "bytes")
+        options.setdefault("normalize", DEFAULT_NORMALIZATION)
+        super().__init__(wordfile, **options)
+
+
+if __name__ == "__main__":
+    autocorrect_shell.go("english_dictionary_unicode")
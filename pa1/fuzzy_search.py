@@ -0,0 +1,124 @@
+# CS122: Auto-completing keyboard using Tries
+# Fuzzy ("did you mean") search
+#
+# Corry Ke
+#
+# The words within a bounded edit distance of a query are found with a
+# depth-first walk of the trie that carries one row of the Levenshtein
+# table per node: the row of a child is computed from the row of its
+# parent and the character on the edge, so shared prefixes are only
+# scored once.  A subtrie is pruned as soon as every entry of its row is
+# over the bound, because the distance can only grow further down.
+# Edges labeled with several characters (a path-compressed trie) add one
+# row per character.
+
+import autocorrect_shell
+
+INSERT_COST = 1
+DELETE_COST = 1
+SUBSTITUTE_COST = 1
+# substituting a key for one of its neighbours on the keyboard
+NEARBY_COST = 0.5
+
+
+def substitution_cost(a, b):
+    '''
+    The cost of typing b where a was meant.  Letters that only differ in
+    case are free and keyboard neighbours are cheaper than other keys.
+
+    Inputs:
+        a, b: (str) single characters
+
+    Returns:
+        (float) the cost
+    '''
+    a = a.lower()
+    b = b.lower()
+    if a == b:
+        return 0
+    if b in autocorrect_shell.nearby_keys(a):
+        return NEARBY_COST
+    return SUBSTITUTE_COST
+
+
+def fuzzy_versions(root, word, max_cost=2, limit=None):
+    '''
+    Find the words of a trie within a bounded edit distance of word
+
+    Inputs:
+        root: the root node of the trie (TrieNode, ArrayTrie, ...)
+        word: (string) the (possibly misspelled) word
+        max_cost: (float) the largest edit distance allowed
+        limit: (int) the largest number of words returned, or None
+
+    Returns:
+        (list) the words, closest first and alphabetical among equals
+    '''
+    n = len(word)
+    # an entry more than band cells off the diagonal needs more than
+    # max_cost insertions or deletions, so only the band is computed
+    band = int(max_cost // min(INSERT_COST, DELETE_COST))
+    too_far = max_cost + 1
+    first_row = [j * INSERT_COST if j <= band else too_far
+                 for j in range(n + 1)]
+    # the substitution costs of each trie character against word
+    sub_rows = {}
+
+    results = []
+    if root.final and first_row[n] <= max_cost:
+        results.append((first_row[n], ''))
+
+    path = []
+    # each frame: (child iterator, row, number of characters on the path)
+    stack = [(iter(root.children()), first_row, 0)]
+    while stack:
+        children, row, depth = stack[-1]
+        for label, child in children:
+            # an edge of a path-compressed trie has several characters,
+            # which each add a row
+            new_row = row
+            d = depth
+            for char in label:
+                costs = sub_rows.get(char)
+                if costs is None:
+                    costs = [substitution_cost(char, c) for c in word]
+                    sub_rows[char] = costs
+
+                d += 1
+                prev_row = new_row
+                new_row = [too_far] * (n + 1)
+                if d <= band:
+                    left = new_row[0] = d * DELETE_COST
+                    best = left
+                else:
+                    left = best = too_far
+                for j in range(max(d - band, 1), min(d + band, n) + 1):
+                    # the cheapest of a deletion, an insertion or a
+                    # substitution
+                    cost = prev_row[j] + DELETE_COST
+                    left += INSERT_COST
+                    if left < cost:
+                        cost = left
+                    left = prev_row[j - 1] + costs[j - 1]
+                    if cost < left:
+                        left = cost
+                    new_row[j] = left
+                    if left < best:
+                        best = left
+                if best > max_cost:
+                    break
+            else:
+                path.append(label)
+                if child.final and new_row[n] <= max_cost:
+                    results.append((new_row[n], ''.join(path)))
+                stack.append((iter(child.children()), new_row, d))
+                break
+        else:
+            stack.pop()
+            if path:
+                path.pop()
+
+    results.sort()
+    if limit is not None:
+        del results[limit:]
+    return [w for _, w in results]
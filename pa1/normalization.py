@@ -0,0 +1,128 @@
+# CS122: Auto-completing keyboard using Tries
+# Unicode normalization of words and prefixes
+#
+# Corry Ke
+#
+# A Normalizer maps a string to the form the words are stored in: an
+# optional Unicode normalization form, case folding and accent stripping.
+# An EnglishDictionary with a normalizer applies it once to every word it
+# loads and to every word or prefix it is asked about, so "Apple",
+# "apple" and "APPLE" lead to the same node of the trie.  Pure ASCII
+# strings, the common case, skip the unicodedata calls entirely.
+
+import unicodedata
+
+FORMS = ("NFC", "NFKC", "NFD", "NFKD")
+CASEFOLD = "casefold"
+STRIP_ACCENTS = "strip_accents"
+
+
+class Normalizer(object):
+    def __init__(self, form=None, casefold=False, strip_accents=False):
+        '''
+        Constructor
+
+        Inputs:
+            form: (string) one of FORMS, or None
+            casefold: (bool) whether to fold case ("Straße" -> "strasse")
+            strip_accents: (bool) whether to drop combining marks
+              ("café" -> "cafe")
+        '''
+        if form is not None and form not in FORMS:
+            raise ValueError("unknown normalization form: %s" % form)
+        self.form = form
+        self.casefold = casefold
+        self.strip_accents = strip_accents
+        # accents are stripped from the (compatibility) decomposition
+        if form is not None and form.startswith("NFK"):
+            self._decomposition = "NFKD"
+        else:
+            self._decomposition = "NFD"
+        # stripping leaves the other characters decomposed (e.g. Hangul
+        # syllables), so they are composed again
+        self._final_form = form
+        if form is None and strip_accents:
+            self._final_form = "NFC"
+
+    @classmethod
+    def from_spec(cls, spec):
+        '''
+        Build a normalizer from a comma-separated list of steps, e.g.
+        "NFKC,casefold,strip_accents".
+
+        Inputs:
+            spec: (string) the steps
+
+        Returns:
+            (Normalizer) the normalizer
+        '''
+        form = None
+        casefold = strip_accents = False
+        for step in spec.split(","):
+            step = step.strip()
+            if step.upper() in FORMS:
+                form = step.upper()
+            elif step.lower() == CASEFOLD:
+                casefold = True
+            elif step.lower() == STRIP_ACCENTS:
+                strip_accents = True
+            elif step != "":
+                raise ValueError("unknown normalization step: %s" % step)
+        return cls(form, casefold, strip_accents)
+
+    @property
+    def spec(self):
+        '''
+        The spec string from_spec would build this normalizer from
+        '''
+        steps = []
+        if self.form is not None:
+            steps.append(self.form)
+        if self.casefold:
+            steps.append(CASEFOLD)
+        if self.strip_accents:
+            steps.append(STRIP_ACCENTS)
+        return ",".join(steps)
+
+    def __call__(self, s):
+        '''
+        Normalize a string
+
+        Inputs:
+            s: (string) a word, prefix or single character
+
+        Returns:
+            (string) the normalized string, which may have a different
+            length (e.g. "ß" case folds to "ss")
+        '''
+        if s.isascii():
+            return s.lower() if self.casefold else s
+        if self.strip_accents:
+            s = "".join(c for c in unicodedata.normalize(self._decomposition, s)
+                        if not unicodedata.combining(c))
+        if self.casefold:
+            s = s.casefold()
+        if self._final_form is not None:
+            s = unicodedata.normalize(self._final_form, s)
+        return s
+
+    def __repr__(self):
+        return "Normalizer(%r)" % self.spec
+
+
+def get_normalizer(normalize):
+    '''
+    Turn the normalize option of EnglishDictionary into a Normalizer
+
+    Inputs:
+        normalize: a Normalizer, a spec string or None
+
+    Returns:
+        (Normalizer) the normalizer, or None for no normalization
+    '''
+    if normalize is None or isinstance(normalize, Normalizer):
+        return normalize
+    normalizer = Normalizer.from_spec(normalize)
+    if normalizer.spec == "":
+        return None
+    return normalizer
@@ -0,0 +1,154 @@
+# CS122: Auto-completing keyboard using Tries
+# Parallel build of the array-backed trie
+#
+# Corry Ke
+#
+# The words are sharded by their first character: the characters are
+# spread over one shard per worker so that the shards hold about the
+# same number of words, and a pool of processes builds one ArrayTrie per
+# shard.  Each worker reads the word file itself and keeps the words of
+# its shard, so no word list is sent between processes; what comes back
+# is the raw bytes of five arrays.  The shards share nothing but the
+# root, so merging them is a concatenation of their arrays with the node
+# indices shifted, after which the children of the root are relinked in
+# the order their first characters appear in the word file, which is the
+# order a serial build gives them.
+
+import multiprocessing
+from array import array
+
+import array_trie
+import english_dictionary
+from array_trie import NO_NODE, ROOT
+
+
+def plan_shards(wordfile, num_shards, normalizer=None):
+    '''
+    Group the first characters of the words into shards of about the
+    same size, largest characters first, each into the smallest shard.
+
+    Inputs:
+        wordfile: (string) name of the file with the words
+        num_shards: (int) the largest number of shards
+        normalizer: (Normalizer) applied to the words, or None
+
+    Returns:
+        (list of strings, list of sets) the first characters in order
+        of first appearance, and the characters of each shard
+    '''
+    sizes = {}
+    with open(wordfile, encoding="utf-8") as f:
+        for w in english_dictionary.read_words(f, normalizer):
+            sizes[w[0]] = sizes.get(w[0], 0) + 1
+
+    shards = [[0, set()] for _ in range(min(num_shards, len(sizes)))]
+    for char in sorted(sizes, key=sizes.get, reverse=True):
+        shard = min(shards, key=lambda s: s[0])
+        shard[0] += sizes[char]
+        shard[1].add(char)
+    return list(sizes), [chars for _, chars in shards]
+
+
+def _build_shard(args):
+    '''
+    Build the trie of the words of one shard in a worker
+
+    Inputs:
+        args: (tuple) the word file, the first characters of the shard
+          and the normalizer
+
+    Returns:
+        (list of bytes) the contents of the arrays of the trie, in the
+        order of array_trie.LAYOUT
+    '''
+    wordfile, chars, normalizer = args
+    trie = array_trie.ArrayTrie()
+    with open(wordfile, encoding="utf-8") as f:
+        trie.add_words(w for w in english_dictionary.read_words(f, normalizer)
+                       if w[0] in chars)
+    return [bytes(getattr(trie, name)) for name, _ in array_trie.LAYOUT]
+
+
+def merge_shards(shards, order):
+    '''
+    Merge the tries of shards with disjoint first characters under a
+    common root
+
+    Inputs:
+        shards: (list) the array contents returned by _build_shard
+        order: (list of strings) the first characters in the order the
+          root's children should have
+
+    Returns:
+        (ArrayTrie) the merged trie
+    '''
+    chars = array('I', [0])
+    first_child = array('i', [NO_NODE])
+    next_sibling = array('i', [NO_NODE])
+    counts = array('i', [0])
+    finals = bytearray(1)
+    rank = {char: i for i, char in enumerate(order)}
+    roots = []
+
+    for data in shards:
+        shard = {}
+        for (name, typecode), raw in zip(array_trie.LAYOUT, data):
+            a = array(typecode)
+            a.frombytes(raw)
+            shard[name] = a
+        # node j > 0 of the shard becomes node base + j; the shard root
+        # is dropped
+        base = len(counts) - 1
+
+        def shift(indices):
+            return array('i', [NO_NODE if j == NO_NODE else j + base
+                               for j in indices[1:]])
+
+        chars.extend(shard["chars"][1:])
+        first_child.extend(shift(shard["first_child"]))
+        next_sibling.extend(shift(shard["next_sibling"]))
+        counts.extend(shard["counts"][1:])
+        finals.extend(shard["finals"][1:])
+        counts[ROOT] += shard["counts"][ROOT]
+
+        j = shard["first_child"][ROOT]
+        while j != NO_NODE:
+            roots.append(j + base)
+            j = shard["next_sibling"][j]
+
+    roots.sort(key=lambda j: rank[chr(chars[j])])
+    following = NO_NODE
+    for j in reversed(roots):
+        next_sibling[j] = following
+        following = j
+    first_child[ROOT] = following
+
+    return array_trie.ArrayTrie.from_buffers(chars, first_child, next_sibling,
+                                             counts, finals)
+
+
+def build(wordfile, workers=None, normalizer=None):
+    '''
+    Build the array trie of a word file with a pool of processes
+
+    Inputs:
+        wordfile: (string) name of the file with the words
+        workers: (int) the number of processes, or None for one per core
+        normalizer: (Normalizer) applied to the words, or None
+
+    Returns:
+        (ArrayTrie) the trie, with the same words and the same order of
+        children as a serial build
+    '''
+    if workers is None:
+        workers = multiprocessing.cpu_count()
+    elif workers < 1:
+        raise ValueError("a parallel build needs at least one worker")
+    order, shards = plan_shards(wordfile, workers, normalizer)
+    jobs = [(wordfile, chars, normalizer) for chars in shards]
+    if len(jobs) <= 1:
+        results = [_build_shard(job) for job in jobs]
+    else:
+        with multiprocessing.Pool(len(jobs)) as pool:
+            results = pool.map(_build_shard, jobs)
+    return merge_shards(results, order)
@@ -0,0 +1,265 @@
+# CS122: Auto-completing keyboard using Tries
+# Radix (path-compressed) trie
+#
+# Corry Ke
+#
+# In a radix trie a chain of nodes with one child each is a single edge
+# labeled with a whole string, so only the nodes where words end or
+# branch are stored.  The label of an edge is kept on the node it leads
+# to, and a node indexes its children by the first character of their
+# labels.  Adding a word that leaves an edge part way splits the edge.
+#
+# A prefix can stop in the middle of an edge.  Such a position is
+# returned as a RadixPoint, which answers count, final, child, children
+# and find like a node, so every query of EnglishDictionary (and the
+# PrefixCursor) works unchanged.  children() yields whole edge labels,
+# so completions are emitted a label at a time.
+
+
+class RadixNode(object):
+    __slots__ = ('label', 'sub', 'count', 'final')
+
+    def __init__(self, label=''):
+        '''
+        Constructor
+
+        Inputs:
+            label: (string) the label of the edge leading to the node
+        '''
+        self.label = label
+        # first character of a child's label -> child; None for a leaf
+        self.sub = None
+        self.count = 0
+        self.final = False
+
+    def find(self, prefix):
+        '''
+        Walk down the trie from this node along the characters of prefix
+
+        Inputs:
+            prefix: (string) the characters to follow
+
+        Returns:
+            (RadixNode or RadixPoint) the position reached, or None if
+            prefix leaves the trie
+        '''
+        node = self
+        i = 0
+        n = len(prefix)
+        while i < n:
+            if node.sub is None:
+                return None
+            child = node.sub.get(prefix[i])
+            if child is None:
+                return None
+            label = child.label
+            if prefix.startswith(label, i):
+                i += len(label)
+                node = child
+            elif label.startswith(prefix[i:]):
+                return RadixPoint(child, n - i)
+            else:
+                return None
+        return node
+
+    def child(self, char):
+        '''
+        Get the position reached from this node by char
+
+        Inputs:
+            char: (str) a single character
+
+        Returns:
+            (RadixNode or RadixPoint) the position, or None
+        '''
+        if self.sub is None:
+            return None
+        child = self.sub.get(char)
+        if child is None or len(child.label) == 1:
+            return child
+        return RadixPoint(child, 1)
+
+    def children(self):
+        '''
+        Get the (label, child) pairs of this node in insertion order
+        '''
+        if self.sub is None:
+            return ()
+        return ((child.label, child) for child in self.sub.values())
+
+    def add_word(self, word):
+        '''
+        Add a word to the trie, splitting the edge where the word leaves
+        the trie if that is in the middle of an edge.
+
+        Inputs:
+            word: (string) the word
+
+        Returns:
+            (bool) False if the word was already in the trie, True otherwise
+        '''
+        path = [self]
+        node = self
+        i = 0
+        n = len(word)
+        while i < n:
+            child = None if node.sub is None else node.sub.get(word[i])
+            if child is None:
+                child = RadixNode(word[i:])
+                if node.sub is None:
+                    node.sub = {}
+                node.sub[word[i]] = child
+                node = child
+                path.append(node)
+                break
+            label = child.label
+            m = min(len(label), n - i)
+            j = 1
+            while j < m and label[j] == word[i + j]:
+                j += 1
+            if j < len(label):
+                # split the edge: the first j characters lead to a new node
+                mid = RadixNode(label[:j])
+                mid.count = child.count
+                mid.sub = {label[j]: child}
+                child.label = label[j:]
+                node.sub[word[i]] = mid
+                child = mid
+            node = child
+            path.append(node)
+            i += j
+
+        if node.final:
+            return False
+        node.final = True
+        for p in path:
+            p.count += 1
+        return True
+
+    def add_words(self, words):
+        '''
+        Add many words
+
+        Inputs:
+            words: (iterable of strings) the words to add
+
+        Returns:
+            (int) the number of words that were not in the trie yet
+        '''
+        add_word = self.add_word
+        return sum(1 for w in words if add_word(w))
+
+    def remove_word(self, word):
+        '''
+        Remove a word from the trie.  The edge that led only to this word
+        is dropped, and a node left with one child and no word of its own
+        is merged with that child.
+
+        Inputs:
+            word: (string) the word to remove
+
+        Returns:
+            (bool) True if the word was in the trie, False otherwise
+        '''
+        path = [self]
+        node = self
+        i = 0
+        while i < len(word):
+            child = None if node.sub is None else node.sub.get(word[i])
+            if child is None or not word.startswith(child.label, i):
+                return False
+            node = child
+            path.append(node)
+            i += len(node.label)
+        if not node.final:
+            return False
+
+        node.final = False
+        for p in path:
+            p.count -= 1
+        if node.count == 0 and len(path) > 1:
+            parent = path[-2]
+            del parent.sub[node.label[0]]
+            if not parent.sub:
+                parent.sub = None
+            node = parent
+        if node is not self and not node.final and len(node.sub) == 1:
+            node._absorb_child()
+        return True
+
+    def _absorb_child(self):
+        '''
+        Merge the only child of a node without a word into the node
+        '''
+        (child,) = self.sub.values()
+        self.label += child.label
+        self.sub = child.sub
+        self.final = child.final
+
+    def __len__(self):
+        '''
+        The number of nodes in the trie, including this one
+        '''
+        n = 0
+        stack = [self]
+        while stack:
+            node = stack.pop()
+            n += 1
+            if node.sub is not None:
+                stack.extend(node.sub.values())
+        return n
+
+    def __repr__(self):
+        return f'RadixNode({self.label!r}, count: {self.count}, final: {self.final})'
+
+
+class RadixPoint(object):
+    '''
+    A position part way along the edge into a node: the first depth
+    characters of the node's label have been followed.
+    '''
+    __slots__ = ('node', 'depth')
+
+    def __init__(self, node, depth):
+        '''
+        Constructor
+
+        Inputs:
+            node: (RadixNode) the node the edge leads to
+            depth: (int) the number of characters of its label followed,
+              between 1 and len(label) - 1
+        '''
+        self.node = node
+        self.depth = depth
+
+    @property
+    def count(self):
+        return self.node.count
+
+    @property
+    def final(self):
+        return False
+
+    def find(self, prefix):
+        rest = self.node.label[self.depth:]
+        if prefix.startswith(rest):
+            return self.node.find(prefix[len(rest):])
+        if rest.startswith(prefix):
+            if prefix == '':
+                return self
+            return RadixPoint(self.node, self.depth + len(prefix))
+        return None
+
+    def child(self, char):
+        label = self.node.label
+        if label[self.depth] != char:
+            return None
+        if self.depth + 1 == len(label):
+            return self.node
+        return RadixPoint(self.node, self.depth + 1)
+
+    def children(self):
+        return ((self.node.label[self.depth:], self.node),)
+
+    def __repr__(self):
+        return f'RadixPoint({self.node!r}, depth: {self.depth})'
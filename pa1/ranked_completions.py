@@ -0,0 +1,200 @@
+# CS122: Auto-completing keyboard using Tries
+# Frequency-ranked completions
+#
+# Corry Ke
+#
+# Every word has a weight (its frequency) and the best completions of a
+# prefix are the k words under it with the largest weights, ties broken
+# alphabetically.  The best k words of every node with more than k words
+# under it are computed once, bottom-up, and cached by prefix, so a
+# ranked query is a single lookup.  A node with at most k words under it
+# is not cached: its words are few enough to rank on the spot.
+
+import heapq
+
+DEFAULT_TOP_K = 10
+
+
+def read_weights(freqfile):
+    '''
+    Read a word-frequency file with one "word weight" pair per line.
+    Blank and malformed lines are skipped.
+
+    Inputs:
+        freqfile: (string) name of the frequency file
+
+    Returns:
+        (dict) mapping words to their (float) weights
+    '''
+    weights = {}
+    with open(freqfile, encoding="utf-8") as f:
+        for line in f:
+            fields = line.split()
+            if len(fields) != 2:
+                continue
+            try:
+                weights[fields[0]] = float(fields[1])
+            except ValueError:
+                continue
+    return weights
+
+
+class RankedCompletions(object):
+    def __init__(self, eng_dict, weights, k=DEFAULT_TOP_K):
+        '''
+        Constructor: rank the words of a dictionary and cache the best
+        k completions of every large enough prefix.
+
+        Inputs:
+            eng_dict: (EnglishDictionary) the dictionary to rank
+            weights: (dict) mapping words to weights; words that are
+              missing have weight 0
+            k: (int) the number of completions cached per prefix
+        '''
+        self.eng_dict = eng_dict
+        self.weights = {w: wt for w, wt in weights.items()
+                        if eng_dict.is_word(w)}
+        self.k = k
+        self.best = {}
+        self._build()
+
+    def _entry(self, word):
+        '''
+        The sort key of a word: larger weights first, then alphabetical
+        '''
+        return (-self.weights.get(word, 0), word)
+
+    def _build(self):
+        '''
+        Compute the best k entries of every node with a post-order walk
+        that keeps its own stack, caching the lists of large nodes.
+        '''
+        k = self.k
+        root = self.eng_dict.words
+        # each frame: [node, prefix, child iterator, candidate entries]
+        stack = [[root, '', iter(root.children()), []]]
+        if root.final:
+            stack[0][3].append(self._entry(''))
+
+        while stack:
+            frame = stack[-1]
+            node, prefix, children, entries = frame
+            for char, child in children:
+                word = prefix + char
+                stack.append([child, word, iter(child.children()),
+                              [self._entry(word)] if child.final else []])
+                break
+            else:
+                stack.pop()
+                entries.sort()
+                del entries[k:]
+                if node.count > k:
+                    self.best[prefix] = entries
+                if stack:
+                    stack[-1][3].extend(entries)
+
+    def _node_entries(self, node, prefix):
+        '''
+        Get the best k entries of a node, from the cache if the node is
+        large or by ranking all of its words otherwise.
+        '''
+        if node.count > self.k:
+            entries = self.best.get(prefix)
+            if entries is None:
+                # a position in the middle of an edge of a path-compressed
+                # trie has the words of the node the edge leads to
+                (label, child), = node.children()
+                entries = self._node_entries(child, prefix + label)
+            return entries
+        entries = [self._entry(prefix + suff) for suff in
+                   self.eng_dict.iter_completion_suffix(node, None, 0)]
+        entries.sort()
+        return entries
+
+    def top_completions(self, prefix, k=None):
+        '''
+        Get the suffixes of the best completions of a prefix
+
+        Inputs:
+            prefix: (string) the prefix
+            k: (int) the number of completions, at most the k the ranking
+              was built with (the default)
+
+        Returns:
+            (list) the suffixes, best first
+        '''
+        if k is None or k > self.k:
+            k = self.k
+        entries = self.best.get(prefix)
+        if entries is None:
+            node = self.eng_dict.words.find(prefix)
+            if node is None:
+                return []
+            entries = self._node_entries(node, prefix)
+        n = len(prefix)
+        return [word[n:] for _, word in entries[:k]]
+
+    def set_weight(self, word, weight):
+        '''
+        Change the weight of a word and repair the cached lists of the
+        prefixes of that word.
+
+        Inputs:
+            word: (string) a word of the dictionary
+            weight: (float) its new weight
+
+        Returns:
+            None
+        '''
+        if not self.eng_dict.is_word(word):
+            raise KeyError(word)
+
+        self.weights[word] = weight
+        self.repair(word)
+
+    def repair(self, word):
+        '''
+        Recompute the cached lists of the prefixes of a word, from the
+        longest to the shortest, after the weight of the word changed or
+        the word was added to or removed from the dictionary.  Prefixes
+        that are no longer large (or no longer in the dictionary) leave
+        the cache.
+
+        Inputs:
+            word: (string) the word
+
+        Returns:
+            None
+        '''
+        node = self.eng_dict.words
+        path = [node]
+        for char in word:
+            node = node.child(char)
+            if node is None:
+                break
+            path.append(node)
+
+        for i in range(len(word), -1, -1):
+            prefix = word[:i]
+            if i >= len(path) or path[i].count <= self.k:
+                self.best.pop(prefix, None)
+            else:
+                self.best[prefix] = self._merge(path[i], prefix)
+
+    def remove_word(self, word):
+        '''
+        Forget the weight of a word that was removed from the dictionary
+        and repair the cached lists of its prefixes.
+        '''
+        self.weights.pop(word, None)
+        self.repair(word)
+
+    def _merge(self, node, prefix):
+        '''
+        Recompute the best k entries of a large node from its own word
+        and the best entries of its children.
+        '''
+        candidates = [self._entry(prefix)] if node.final else []
+        for char, child in node.children():
+            candidates.extend(self._node_entries(child, prefix + char))
+        return heapq.nsmallest(self.k, candidates)
@@ -0,0 +1,60 @@
+# CS122: Auto-completing keyboard using Tries
+# Tests of the log of changes to a live dictionary
+#
+# Usage:
+#   python3 -m unittest test_word_log
+
+import os
+import tempfile
+import unittest
+
+import english_dictionary
+import word_log
+
+
+class TornTailTest(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.wordfile = os.path.join(self.dir.name, "words")
+        self.log = os.path.join(self.dir.name, "words.log")
+        with open(self.wordfile, "w") as f:
+            f.write("are\nat\n")
+        # a crash cut the write of "+bet" short
+        with open(self.log, "w") as f:
+            f.write("+alpha\n+bet")
+
+    def tearDown(self):
+        self.dir.cleanup()
+
+    def test_replay_skips_torn_line(self):
+        self.assertEqual(list(word_log.read_log(self.log)),
+                         [(word_log.ADD, "alpha")])
+
+    def test_append_after_torn_line(self):
+        eng_dict = english_dictionary.EnglishDictionary(self.wordfile,
+                                                        log=self.log)
+        eng_dict.add_word("gamma")
+        eng_dict.close()
+        with open(self.log) as f:
+            self.assertEqual(f.read(), "+alpha\n+gamma\n")
+
+        eng_dict = english_dictionary.EnglishDictionary(self.wordfile,
+                                                        log=self.log)
+        eng_dict.close()
+        self.assertTrue(eng_dict.is_word("alpha"))
+        self.assertTrue(eng_dict.is_word("gamma"))
+        self.assertFalse(eng_dict.is_word("bet"))
+        self.assertFalse(eng_dict.is_word("bet+gamma"))
+
+    def test_truncate_without_newline(self):
+        with open(self.log, "w") as f:
+            f.write("+bet")
+        word_log.truncate_torn_tail(self.log)
+        self.assertEqual(os.path.getsize(self.log), 0)
+
+    def test_truncate_missing_log(self):
+        word_log.truncate_torn_tail(os.path.join(self.dir.name, "none"))
+
+
+if __name__ == "__main__":
+    unittest.main()
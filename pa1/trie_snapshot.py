@@ -0,0 +1,188 @@
+# CS122: Auto-completing keyboard using Tries
+# Memory-mapped snapshots of the array-backed trie
+#
+# Corry Ke
+#
+# A snapshot is a small header followed by the raw contents of the arrays
+# of an ArrayTrie.  Loading a snapshot memory-maps the file and points the
+# trie at the mapped bytes, so it takes the same time for any number of
+# words and every process that loads the same snapshot shares its pages.
+# The header records the word file and the normalization the trie was
+# built with; a snapshot that does not match them is rebuilt.
+
+import mmap
+import os
+import struct
+import sys
+
+import array_trie
+import normalization
+
+MAGIC = b"CS122TRI"
+VERSION = 2
+
+# magic, version, little endian flag, number of nodes, mtime (ns) and
+# size of the word file the snapshot was built from, normalization spec
+HEADER = struct.Struct("=8sIIQqQ64s")
+ALIGN = 8
+
+# (attribute, typecode) of the ArrayTrie arrays, in file order
+LAYOUT = array_trie.LAYOUT
+
+
+def _padding(n):
+    return -n % ALIGN
+
+
+def source_stamp(wordfile):
+    '''
+    Get the values that identify the current version of a word file
+
+    Inputs:
+        wordfile: (string) name of the file with the words
+
+    Returns:
+        (tuple) mtime in nanoseconds and size in bytes
+    '''
+    st = os.stat(wordfile)
+    return st.st_mtime_ns, st.st_size
+
+
+def _spec(normalizer):
+    if normalizer is None:
+        return b""
+    return normalizer.spec.encode()
+
+
+def write_snapshot(trie, wordfile, snapshot, normalizer=None):
+    '''
+    Write an array trie to a snapshot file.  The file is written under a
+    temporary name and renamed, so a process never maps a partial file.
+
+    Inputs:
+        trie: (ArrayTrie) the finished trie
+        wordfile: (string) name of the file the trie was built from
+        snapshot: (string) name of the snapshot file
+        normalizer: (Normalizer) the normalization of the words, or None
+
+    Returns:
+        None
+    '''
+    mtime_ns, size = source_stamp(wordfile)
+    tmp = "%s.%d.tmp" % (snapshot, os.getpid())
+    with open(tmp, "wb") as f:
+        f.write(HEADER.pack(MAGIC, VERSION, sys.byteorder == "little",
+                            len(trie), mtime_ns, size, _spec(normalizer)))
+        f.write(bytes(_padding(HEADER.size)))
+        for name, _ in LAYOUT:
+            data = memoryview(getattr(trie, name)).cast("B")
+            f.write(data)
+            f.write(bytes(_padding(len(data))))
+    os.replace(tmp, snapshot)
+
+
+def load_snapshot(snapshot, wordfile=None, normalizer=None):
+    '''
+    Memory-map a snapshot file.  The returned trie reads straight from the
+    mapped pages and is read-only.
+
+    Inputs:
+        snapshot: (string) name of the snapshot file
+        wordfile: (string) if given, the word file the snapshot must
+          be up to date with
+        normalizer: (Normalizer) the normalization the snapshot must have
+          been built with, when wordfile is given
+
+    Returns:
+        (ArrayTrie) the trie, or None if the snapshot is missing,
+        unreadable or stale
+    '''
+    try:
+        with open(snapshot, "rb") as f:
+            mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    except (OSError, ValueError):
+        return None
+
+    if len(mm) < HEADER.size:
+        return None
+    magic, version, little, nodes, mtime_ns, size, spec = \
+        HEADER.unpack_from(mm)
+    if (magic != MAGIC or version != VERSION
+            or little != (sys.byteorder == "little")):
+        return None
+    if wordfile is not None and (
+            (mtime_ns, size) != source_stamp(wordfile)
+            or spec.rstrip(b"\0") != _spec(normalizer)):
+        return None
+
+    buf = memoryview(mm)
+    offset = HEADER.size + _padding(HEADER.size)
+    arrays = {}
+    for name, typecode in LAYOUT:
+        nbytes = nodes * struct.calcsize(typecode)
+        if offset + nbytes > len(mm):
+            return None
+        arrays[name] = buf[offset:offset + nbytes].cast(typecode)
+        offset += nbytes + _padding(nbytes)
+
+    return array_trie.ArrayTrie.from_buffers(**arrays)
+
+
+def load_or_build(wordfile, snapshot, normalizer=None, workers=None):
+    '''
+    Load the snapshot of a word file, first (re)building it when it is
+    missing, older than the word file or built with another normalization.
+
+    Inputs:
+        wordfile: (string) name of the file with the words
+        snapshot: (string) name of the snapshot file
+        normalizer: (Normalizer) the normalization of the words, or None
+        workers: (int) the number of processes that build the snapshot,
+          or None for a serial build
+
+    Returns:
+        (ArrayTrie) the memory-mapped trie
+    '''
+    trie = load_snapshot(snapshot, wordfile, normalizer)
+    if trie is None:
+        build_snapshot(wordfile, snapshot, normalizer, workers)
+        trie = load_snapshot(snapshot, wordfile, normalizer)
+    return trie
+
+
+def build_snapshot(wordfile, snapshot, normalizer=None, workers=None):
+    '''
+    Build the array trie of a word file and write it to a snapshot
+
+    Inputs:
+        wordfile: (string) name of the file with the words
+        snapshot: (string) name of the snapshot file
+        normalizer: (Normalizer) applied to the words, or None
+        workers: (int) the number of processes that build the trie (see
+          parallel_build), or None for a serial build
+
+    Returns:
+        None
+    '''
+    if workers is not None:
+        import parallel_build
+        trie = parallel_build.build(wordfile, workers, normalizer)
+    else:
+        trie = array_trie.ArrayTrie()
+        with open(wordfile, encoding="utf-8") as f:
+            words = (line.strip() for line in f)
+            if normalizer is not None:
+                words = map(normalizer, words)
+            trie.add_words(w for w in words if w != "")
+    write_snapshot(trie, wordfile, snapshot, normalizer)
+
+
+if __name__ == "__main__":
+    if len(sys.argv) not in (3, 4):
+        print("Usage: python3 trie_snapshot.py WORD_FILE SNAPSHOT_FILE "
+              "[NORMALIZATION]")
+        sys.exit(1)
+    normalizer = None
+    if len(sys.argv) == 4:
+        normalizer = normalization.get_normalizer(sys.argv[3])
+    build_snapshot(sys.argv[1], sys.argv[2], normalizer)
@@ -0,0 +1,129 @@
+# CS122: Auto-completing keyboard using Tries
+# Log of the changes made to a live dictionary
+#
+# Corry Ke
+#
+# Every word added to or removed from an EnglishDictionary after it is
+# loaded is appended to a log file as one line, "+word" or "-word".  On
+# startup the log is replayed on top of the word file (or snapshot).
+# Replaying is idempotent, because adding a word that is there or
+# removing one that is not changes nothing, so compacting the log down to
+# the last change of each word, and rebuilding the snapshot from the live
+# dictionary, never changes the result of a later startup.  A last line
+# cut short by a crash is skipped on replay and cut off before the log
+# is appended to again.
+
+import os
+
+ADD = "+"
+REMOVE = "-"
+
+
+def read_log(path):
+    '''
+    Generate the changes recorded in a log.  A missing log has no
+    changes, and a last line without a newline (a write cut short by a
+    crash) is ignored.
+
+    Inputs:
+        path: (string) name of the log file
+
+    Returns:
+        generator of (op, word) pairs, where op is ADD or REMOVE
+    '''
+    try:
+        f = open(path, encoding="utf-8")
+    except FileNotFoundError:
+        return
+    with f:
+        for line in f:
+            if not line.endswith("\n"):
+                break
+            op, word = line[:1], line[1:-1]
+            if op in (ADD, REMOVE) and word:
+                yield op, word
+
+
+def truncate_torn_tail(path):
+    '''
+    Cut a log back to the end of its last complete line, so that the
+    next change is not appended to a line that read_log ignores
+
+    Inputs:
+        path: (string) name of the log file
+    '''
+    try:
+        f = open(path, "rb+")
+    except FileNotFoundError:
+        return
+    with f:
+        size = f.seek(0, os.SEEK_END)
+        end = size
+        keep = 0
+        while end > 0:
+            start = max(0, end - 4096)
+            f.seek(start)
+            i = f.read(end - start).rfind(b"\n")
+            if i >= 0:
+                keep = start + i + 1
+                break
+            end = start
+        if keep != size:
+            f.truncate(keep)
+
+
+class WordLog(object):
+    def __init__(self, path, sync=False):
+        '''
+        Constructor: open a log for appending
+
+        Inputs:
+            path: (string) name of the log file
+            sync: (bool) whether to fsync after every change, which makes
+              each change durable across power loss but costs a disk
+              flush per change
+        '''
+        self.path = path
+        self.sync = sync
+        truncate_torn_tail(path)
+        self.f = open(path, "a", encoding="utf-8")
+        # the number of changes appended since the last compaction
+        self.appended = 0
+
+    def append(self, op, word):
+        '''
+        Record one change
+
+        Inputs:
+            op: ADD or REMOVE
+            word: (string) the word
+        '''
+        self.f.write(op + word + "\n")
+        self.f.flush()
+        if self.sync:
+            os.fsync(self.f.fileno())
+        self.appended += 1
+
+    def compact(self):
+        '''
+        Rewrite the log with only the last change of each word.  The new
+        log is written under a temporary name and renamed into place.
+        '''
+        last = {}
+        for op, word in read_log(self.path):
+            last.pop(word, None)
+            last[word] = op
+
+        self.f.close()
+        tmp = "%s.%d.tmp" % (self.path, os.getpid())
+        with open(tmp, "w", encoding="utf-8") as f:
+            for word, op in last.items():
+                f.write(op + word + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, self.path)
+        self.f = open(self.path, "a", encoding="utf-8")
+        self.appended = 0
+
+    def close(self):
+        self.f.close()
@@ -0,0 +1,190 @@
+# CS122: Course Search Engine Part 1
+# Streaming extraction of the courses of a catalog page
+#
+# Corry Ke
+#
+# A CatalogParser is an html.parser.HTMLParser that picks the courses and
+# the links out of a page while the page is tokenized, without building a
+# tree: it keeps only the text of the course block it is in.  A course
+# block is a div of class "courseblock main"; its title and description
+# are the text of its paragraphs of class courseblocktitle and
+# courseblockdesc.  A main block followed by "courseblock subsequence"
+# blocks (with nothing but whitespace between them, as util.find_sequence
+# looks for them) is the header of a sequence, and the courses of the
+# sequence are the subsequence blocks.  Because that is known only once
+# the next sibling starts, a main block is held until then.
+#
+# Each course is emitted as a Course record, to the on_course function
+# given to the parser as soon as it is known, or collected by parse_page.
+#
+# Usage (print the courses of a saved page):
+#   python3 catalog_parser.py PAGE.html
+
+import collections
+import html.parser
+import sys
+
+# a course: the text of its first title paragraph, the text of all of its
+# title and description paragraphs, and that of the header of its
+# sequence ("" if it is not in one)
+Course = collections.namedtuple("Course", ["title", "text", "sequence"])
+
+TEXT_CLASSES = ("courseblocktitle", "courseblockdesc")
+
+
+class CatalogParser(html.parser.HTMLParser):
+    def __init__(self, on_course):
+        '''
+        Constructor
+
+        Inputs:
+            on_course: (function) called with each Course of the page
+        '''
+        super().__init__()
+        self.on_course = on_course
+        self.links = []
+        # the block being read: its kind ("main" or "subsequence"), the
+        # number of divs open in it, and its paragraphs
+        self._kind = None
+        self._depth = 0
+        self._title = None
+        self._parts = []
+        # the text of the paragraph being read, or None
+        self._para = None
+        # the main block whose next sibling is not known yet, as
+        # (title, text), and whether it turned out to head a sequence
+        self._pending = None
+        self._in_sequence = False
+
+    def _end_sequence(self):
+        '''
+        Something other than a subsequence block follows the last block:
+        emit the pending main block if no subsequence block followed it
+        '''
+        if self._pending is not None:
+            if not self._in_sequence:
+                title, text = self._pending
+                self.on_course(Course(title, text, ""))
+            self._pending = None
+            self._in_sequence = False
+
+    def handle_starttag(self, tag, attrs):
+        if self._kind is None:
+            if tag == "a":
+                href = dict(attrs).get("href")
+                if href is not None:
+                    self.links.append(href)
+            kind = None
+            if tag == "div":
+                classes = (dict(attrs).get("class") or "").split()
+                if classes == ["courseblock", "main"]:
+                    kind = "main"
+                elif (classes == ["courseblock", "subsequence"]
+                      and self._pending is not None):
+                    kind = "subsequence"
+            if kind is None:
+                self._end_sequence()
+                return
+            if kind == "main":
+                self._end_sequence()
+            self._kind = kind
+            self._depth = 1
+            self._title = None
+            self._parts = []
+            return
+
+        if tag == "a":
+            href = dict(attrs).get("href")
+            if href is not None:
+                self.links.append(href)
+        elif tag == "div":
+            self._depth += 1
+        elif tag == "p" and self._para is None:
+            classes = (dict(attrs).get("class") or "").split()
+            if any(c in TEXT_CLASSES for c in classes):
+                self._para = []
+                if self._title is None and "courseblocktitle" in classes:
+                    self._title = self._para
+
+    def handle_startendtag(self, tag, attrs):
+        if self._kind is None:
+            self._end_sequence()
+        if tag == "a":
+            href = dict(attrs).get("href")
+            if href is not None:
+                self.links.append(href)
+
+    def handle_endtag(self, tag):
+        if self._kind is None:
+            self._end_sequence()
+            return
+        if tag == "p" and self._para is not None:
+            self._parts.append("".join(self._para))
+            self._para = None
+        elif tag == "div":
+            self._depth -= 1
+            if self._depth == 0:
+                self._end_block()
+
+    def _end_block(self):
+        if self._para is not None:
+            self._parts.append("".join(self._para))
+            self._para = None
+        title = "" if self._title is None else "".join(self._title)
+        text = " ".join(self._parts)
+        if self._kind == "main":
+            self._pending = (title, text)
+        else:
+            self._in_sequence = True
+            self.on_course(Course(title, text, self._pending[1]))
+        self._kind = None
+
+    def handle_data(self, data):
+        if self._kind is None:
+            if data.strip() != "":
+                self._end_sequence()
+        elif self._para is not None:
+            self._para.append(data)
+
+    def handle_comment(self, data):
+        if self._kind is None:
+            self._end_sequence()
+
+    def close(self):
+        super().close()
+        if self._kind is not None:
+            # a block left open at the end of the page
+            self._end_block()
+        self._end_sequence()
+
+
+def parse_page(page):
+    '''
+    Get the courses and the links of a catalog page
+
+    Inputs:
+        page: (string or bytes) the page; bytes are the ISO-8859-1
+          encoding of the text, as util.read_request returns it
+
+    Returns:
+        (list of Courses, list of strings) the courses and the targets
+        of the links, in the order of the page
+    '''
+    if isinstance(page, bytes):
+        page = page.decode("iso-8859-1")
+    courses = []
+    parser = CatalogParser(courses.append)
+    parser.feed(page)
+    parser.close()
+    return courses, parser.links
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 2:
+        print("Usage: python3 catalog_parser.py PAGE.html")
+        sys.exit(1)
+    with open(sys.argv[1], "rb") as f:
+        courses, links = parse_page(f.read())
+    for course in courses:
+        print(course.title.replace("\xa0", " "))
+    print("%d courses, %d links" % (len(courses), len(links)))
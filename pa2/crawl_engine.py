@@ -0,0 +1,400 @@
+# CS122: Course Search Engine Part 1
+# Asynchronous crawl engine
+#
+# Corry Ke
+#
+# A crawl spends most of its time waiting for servers, so the engine
+# keeps many requests in flight at once.  It runs on asyncio as a
+# pipeline of three stages joined by bounded asyncio.Queues:
+#
+#   fetch: a pool of threads calls util.get_request, each thread with its
+#     own requests.Session so that its connections stay open between
+#     requests.  Each host gets at most per_host requests at a time, and
+#     the requests to a host start at least delay seconds apart.
+#   parse: a pool of parse_workers processes runs parse_page on the pages,
+#     so parsing uses every core and does not hold the GIL the event loop
+#     needs; with parse_workers=0 pages are parsed in the event loop.
+#   merge: the event loop hands the result of each page to merge_page
+#     and puts the page's links in the frontier.
+#
+# A prepare_page function can look at a page in the event loop before it
+# is parsed, and either send a result straight to the merge stage (for a
+# page that has not changed since the last crawl) or give parse_page
+# something more to go on.
+#
+# A full queue holds up the stage before it, so fetches stop when the
+# parsers fall behind.  Each stage counts its pages and the time it spent
+# on them (see stage_stats).
+#
+# The frontier is a bounded FIFO queue.Queue of the URLs that are still
+# to be fetched, so pages are fetched in about breadth-first order.  A
+# URL is put in the frontier at most once, and the URL a fetch was
+# redirected to counts as visited too.  A link found while the frontier
+# is full is dropped (and counted in the statistics of the crawl), or,
+# if the crawl has a crawl_state.CrawlState, spilled to disk.  Which
+# links are followed is decided by the rules of util.is_url_ok_to_follow,
+# exactly as in a serial crawl, applied to the links of a page as a batch
+# by a link_filter.LinkFilter.
+#
+# With a CrawlState the crawl checkpoints every checkpoint_every pages,
+# and a new Crawler with the same state picks up where the last
+# checkpoint left off.  A crawl that ends clears the state.
+
+import asyncio
+import contextlib
+import os
+import queue
+import time
+import urllib.parse
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+import crawl_state
+import link_filter
+import util
+
+# the largest number of requests in flight
+DEFAULT_WORKERS = 16
+# the number of processes that parse pages
+DEFAULT_PARSE_WORKERS = os.cpu_count() or 1
+# the largest number of pages waiting between two stages
+DEFAULT_QUEUE_SIZE = 32
+# the largest number of requests in flight to one host
+DEFAULT_PER_HOST = 4
+# the shortest time between the starts of two requests to a host, in seconds
+DEFAULT_DELAY = 0.05
+# the largest number of URLs waiting in the frontier
+DEFAULT_FRONTIER_SIZE = 100000
+# the number of pages processed between two checkpoints of the state
+DEFAULT_CHECKPOINT_EVERY = 100
+
+
+def _fetch(url):
+    '''
+    Fetch a page in a thread of the pool
+
+    Returns:
+        (string, bytes) the URL after redirects and the contents of the
+        page, or None if the fetch failed
+    '''
+    request = util.get_request(url)
+    if request is None:
+        return None
+    html = util.read_request(request)
+    if html == "":
+        # util.read_request failed (an empty page is b"")
+        return None
+    return util.get_request_url(request), html
+
+
+class Crawler(object):
+    def __init__(self, limiting_domain, parse_page, merge_page,
+                 workers=DEFAULT_WORKERS, per_host=DEFAULT_PER_HOST,
+                 delay=DEFAULT_DELAY, parse_workers=DEFAULT_PARSE_WORKERS,
+                 queue_size=DEFAULT_QUEUE_SIZE, prepare_page=None,
+                 frontier_size=DEFAULT_FRONTIER_SIZE, state=None,
+                 visited=None, checkpoint_every=DEFAULT_CHECKPOINT_EVERY):
+        '''
+        Constructor
+
+        Inputs:
+            limiting_domain: (string) the domain the crawl stays in
+            parse_page: (function) called with the URL and the contents
+              of each page fetched, in a worker process; returns the
+              targets of the page's links and a result for merge_page.
+              It must be a function defined at the top level of a module.
+            merge_page: (function) called with the URL and the result of
+              each page parsed
+            workers: (int) the largest number of requests in flight
+            per_host: (int) the largest number of requests in flight to
+              one host
+            delay: (float) the shortest time between the starts of two
+              requests to a host, in seconds
+            parse_workers: (int) the number of processes that parse
+              pages, or 0 to parse them in the event loop
+            queue_size: (int) the largest number of pages waiting between
+              two stages
+            prepare_page: (function) called in the event loop with the
+              URL and the contents of each page fetched; returns (True,
+              result) to merge result without parsing the page, or
+              (False, context) to parse it with parse_page(url, html,
+              context).  None to parse every page with parse_page(url,
+              html).
+            frontier_size: (int) the largest number of URLs waiting in
+              memory to be fetched
+            state: (CrawlState) the state to resume from and checkpoint
+              to, or None
+            visited: the set of visited URLs (a crawl_state.VisitedSet or
+              BloomFilter), or None for a new VisitedSet
+            checkpoint_every: (int) the number of pages processed between
+              two checkpoints of the state
+        '''
+        self.limiting_domain = limiting_domain
+        self.links = link_filter.LinkFilter(limiting_domain)
+        self.parse_page = parse_page
+        self.merge_page = merge_page
+        self.workers = workers
+        self.per_host = per_host
+        self.delay = delay
+        self.parse_workers = parse_workers
+        self.queue_size = queue_size
+        self.prepare_page = prepare_page
+        self.frontier = queue.Queue(frontier_size)
+        self.state = state
+        self.checkpoint_every = checkpoint_every
+        # every URL that was put in the frontier or fetched
+        if visited is None:
+            visited = crawl_state.VisitedSet()
+        self.visited = visited
+        # host -> semaphore that bounds the requests in flight to it
+        self._host_slots = {}
+        # host -> loop time at which its next request may start
+        self._next_start = {}
+        self.pages = 0
+        self.failed = 0
+        self.skipped = 0
+        self.dropped = 0
+        # stage -> [pages, seconds spent on them]
+        self.stage_stats = {"fetch": [0, 0.0], "parse": [0, 0.0],
+                            "merge": [0, 0.0]}
+        # the URLs taken from the frontier and not yet merged, in order
+        self._pipeline = {}
+        if state is not None:
+            self.pages = state.pages
+            for h in state.iter_visited():
+                visited.add_hash(h)
+            for url in state.load_frontier():
+                self._put(url)
+        self._saved_pages = self.pages
+
+    def _visit(self, url):
+        h = self.visited.add(url)
+        if self.state is not None:
+            self.state.add_visited(h)
+
+    def _put(self, url):
+        '''
+        Put a URL at the end of the frontier, on disk if the part in
+        memory is full or the part on disk is not empty
+        '''
+        if self.state is not None and (self.state.spilled
+                                       or self.frontier.full()):
+            self.state.spill(url)
+        else:
+            self.frontier.put_nowait(url)
+
+    def add_url(self, url):
+        '''
+        Put a URL in the frontier unless it was seen before
+
+        Returns:
+            (bool) True if the URL was added
+        '''
+        if url in self.visited:
+            return False
+        if self.state is None and self.frontier.full():
+            self.dropped += 1
+            return False
+        self._visit(url)
+        self._put(url)
+        return True
+
+    async def _get(self, loop, executor, url):
+        '''
+        Fetch a URL, waiting for a slot of its host and for the host's
+        politeness delay first
+        '''
+        host = urllib.parse.urlsplit(url).netloc
+        slots = self._host_slots.get(host)
+        if slots is None:
+            slots = asyncio.Semaphore(self.per_host)
+            self._host_slots[host] = slots
+        async with slots:
+            now = loop.time()
+            start = max(now, self._next_start.get(host, now))
+            self._next_start[host] = start + self.delay
+            if start > now:
+                await asyncio.sleep(start - now)
+            start = time.perf_counter()
+            result = await loop.run_in_executor(executor, _fetch, url)
+            self._count("fetch", start)
+            return result
+
+    def _count(self, stage, start):
+        stats = self.stage_stats[stage]
+        stats[0] += 1
+        stats[1] += time.perf_counter() - start
+
+    def _done(self, url):
+        '''
+        A URL has left the pipeline
+        '''
+        del self._pipeline[url]
+        self._progress.set()
+
+    async def _fetch_stage(self, loop, executor, url, parse_queue,
+                           merge_queue):
+        result = await self._get(loop, executor, url)
+        if result is None:
+            self.failed += 1
+            self._done(url)
+            return
+        final_url, html = result
+        if final_url != url and (final_url in self.visited
+                                 or not self.links.is_ok(final_url)):
+            self.skipped += 1
+            self._done(url)
+            return
+        args = (final_url, html)
+        if self.prepare_page is not None:
+            ready, value = self.prepare_page(final_url, html)
+            if ready:
+                await merge_queue.put((url, final_url, value))
+                return
+            args += (value,)
+        await parse_queue.put((url, args))
+
+    async def _parse_stage(self, loop, executor, parse_queue, merge_queue):
+        while True:
+            url, args = await parse_queue.get()
+            start = time.perf_counter()
+            if executor is None:
+                result = self.parse_page(*args)
+            else:
+                result = await loop.run_in_executor(
+                    executor, self.parse_page, *args)
+            self._count("parse", start)
+            await merge_queue.put((url, args[0], result))
+
+    async def _merge_stage(self, merge_queue):
+        while True:
+            url, final_url, (hrefs, result) = await merge_queue.get()
+            start = time.perf_counter()
+            self._merge(url, final_url, hrefs, result)
+            self._count("merge", start)
+            self._done(url)
+            if self.pages - self._saved_pages >= self.checkpoint_every:
+                self.checkpoint()
+
+    def _merge(self, url, final_url, hrefs, result):
+        '''
+        Merge the result of a page and put its links in the frontier
+        '''
+        if final_url != url:
+            # another URL may have been redirected to the same page
+            if final_url in self.visited:
+                self.skipped += 1
+                return
+            self._visit(final_url)
+        self.pages += 1
+        self.merge_page(final_url, result)
+        for link in self.links.resolve(final_url, hrefs):
+            self.add_url(link)
+
+    def checkpoint(self):
+        '''
+        Commit the state of the crawl.  The URLs in the pipeline go back
+        to the front of the frontier.
+        '''
+        if self.state is None:
+            return
+        frontier = list(self._pipeline) + list(self.frontier.queue)
+        self.state.checkpoint(self.pages, frontier)
+        self._saved_pages = self.pages
+
+    def _parse_executor(self):
+        if self.parse_workers == 0:
+            return contextlib.nullcontext()
+        return ProcessPoolExecutor(self.parse_workers)
+
+    async def _crawl(self, num_pages):
+        loop = asyncio.get_running_loop()
+        self._progress = asyncio.Event()
+        parse_queue = asyncio.Queue(self.queue_size)
+        merge_queue = asyncio.Queue(self.queue_size)
+        fetches = set()
+        with ThreadPoolExecutor(self.workers) as fetch_executor, \
+                self._parse_executor() as parse_executor:
+            stages = [asyncio.ensure_future(self._parse_stage(
+                loop, parse_executor, parse_queue, merge_queue))
+                for _ in range(max(1, self.parse_workers))]
+            stages.append(asyncio.ensure_future(
+                self._merge_stage(merge_queue)))
+            try:
+                while True:
+                    if self.state is not None and self.state.spilled:
+                        room = self.frontier.maxsize - self.frontier.qsize()
+                        for url in self.state.unspill(room):
+                            self.frontier.put_nowait(url)
+                    while (len(fetches) < self.workers
+                           and self.pages + len(self._pipeline) < num_pages
+                           and not self.frontier.empty()):
+                        url = self.frontier.get_nowait()
+                        self._pipeline[url] = None
+                        fetches.add(asyncio.ensure_future(self._fetch_stage(
+                            loop, fetch_executor, url, parse_queue,
+                            merge_queue)))
+                    if not self._pipeline:
+                        break
+                    self._progress.clear()
+                    progress = asyncio.ensure_future(self._progress.wait())
+                    await asyncio.wait([progress, *stages, *fetches],
+                                       return_when=asyncio.FIRST_COMPLETED)
+                    progress.cancel()
+                    # a stage that stopped raised an exception
+                    for task in stages:
+                        if task.done():
+                            task.result()
+                    for task in [t for t in fetches if t.done()]:
+                        fetches.remove(task)
+                        task.result()
+            finally:
+                for task in stages + list(fetches):
+                    task.cancel()
+
+    def crawl(self, starting_url, num_pages):
+        '''
+        Crawl from a URL until num_pages pages have been processed or no
+        URL is left to fetch
+
+        Inputs:
+            starting_url: (string) the first URL to fetch
+            num_pages: (int) the largest number of pages to process
+
+        Returns:
+            (dict) the statistics of the crawl: pages processed (in all
+            runs, when resuming), fetches that failed, redirects to pages
+            that were skipped, links dropped because the frontier was
+            full, seconds elapsed, whether the crawl ran out of URLs
+            without dropping any (so that it saw every page it could
+            reach), and for each stage the pages it handled, its
+            throughput in pages per second, the time it took on a page
+            and the average number of pages it was working on
+        '''
+        start = time.perf_counter()
+        if self.state is None or self.state.pages == 0:
+            self.add_url(starting_url)
+        try:
+            asyncio.run(self._crawl(num_pages))
+        except BaseException:
+            if self.state is not None:
+                self.state.rollback()
+            raise
+        if self.state is not None:
+            # only an interrupted crawl is resumed
+            self.state.clear()
+        elapsed = time.perf_counter() - start
+        stages = {}
+        for stage, (pages, busy) in self.stage_stats.items():
+            stages[stage] = {"pages": pages,
+                             "per_second": pages / elapsed,
+                             "ms_per_page": 1000 * busy / pages if pages else 0,
+                             "concurrency": busy / elapsed}
+        return {"pages": self.pages,
+                "failed": self.failed,
+                "skipped": self.skipped,
+                "dropped": self.dropped,
+                "seconds": elapsed,
+                "complete": (self.frontier.empty() and self.dropped == 0
+                             and not (self.state is not None
+                                      and self.state.spilled)),
+                "stages": stages}
@@ -0,0 +1,256 @@
+# CS122: Course Search Engine Part 1
+# Resumable crawl state
+#
+# Corry Ke
+#
+# A CrawlState keeps what a crawl has done in a SQLite file, so a crawl
+# that dies can be resumed from its last checkpoint instead of from the
+# starting URL.  The file holds the number of pages processed, the
+# frontier and the hashes of the visited URLs; the index itself is kept
+# by an index_store.IndexStore.  Everything the crawl writes between two
+# checkpoints is part of one transaction, which a checkpoint commits, so
+# the file always holds the state of the crawl at a checkpoint.  A crawl
+# that ends (by running out of URLs or reaching its number of pages)
+# clears the file, so only an interrupted crawl is resumed.
+#
+# The frontier in memory is bounded; URLs that do not fit are spilled to
+# the file, in order, and read back as the frontier drains.
+#
+# In memory, the visited URLs are kept as 64-bit hashes (VisitedSet, 8
+# bytes a URL) or, for very large crawls, in a Bloom filter (about 2 bytes
+# a URL at a 0.1% error rate, at the price of skipping that fraction of
+# the new URLs).  The file always holds the exact hashes.
+
+import bisect
+import hashlib
+import math
+import sqlite3
+from array import array
+
+# the number of hashes a VisitedSet keeps in a Python set before merging
+# them into its sorted array
+MERGE_EVERY = 16384
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value);
+CREATE TABLE IF NOT EXISTS frontier (seq INTEGER PRIMARY KEY, url TEXT);
+CREATE TABLE IF NOT EXISTS spill (seq INTEGER PRIMARY KEY, url TEXT);
+CREATE TABLE IF NOT EXISTS visited (hash INTEGER PRIMARY KEY) WITHOUT ROWID;
+'''
+
+
+def url_hash(url):
+    '''
+    Hash a URL to a signed 64-bit integer
+    '''
+    digest = hashlib.blake2b(url.encode("utf-8"), digest_size=8).digest()
+    return int.from_bytes(digest, "little", signed=True)
+
+
+class VisitedSet(object):
+    '''
+    A set of URLs that stores only their 64-bit hashes: a sorted array,
+    searched by bisection, plus a small set of recent hashes that is
+    merged into the array when it grows
+    '''
+    def __init__(self):
+        self._sorted = array('q')
+        self._recent = set()
+
+    def __contains__(self, url):
+        return self.contains_hash(url_hash(url))
+
+    def contains_hash(self, h):
+        if h in self._recent:
+            return True
+        i = bisect.bisect_left(self._sorted, h)
+        return i < len(self._sorted) and self._sorted[i] == h
+
+    def add(self, url):
+        '''
+        Add a URL
+
+        Returns:
+            (int) the hash of the URL
+        '''
+        h = url_hash(url)
+        self.add_hash(h)
+        return h
+
+    def add_hash(self, h):
+        if self.contains_hash(h):
+            return
+        self._recent.add(h)
+        if len(self._recent) >= MERGE_EVERY:
+            # two sorted runs, which list.sort merges in one pass
+            merged = self._sorted.tolist()
+            merged.extend(sorted(self._recent))
+            merged.sort()
+            self._sorted = array('q', merged)
+            self._recent = set()
+
+    def __len__(self):
+        return len(self._sorted) + len(self._recent)
+
+
+class BloomFilter(object):
+    '''
+    A set of URLs in a Bloom filter sized for a number of URLs and an
+    error rate.  A URL that was never added is reported as present with
+    about that probability.
+    '''
+    def __init__(self, capacity, error_rate=0.001):
+        '''
+        Constructor
+
+        Inputs:
+            capacity: (int) the number of URLs the filter is sized for
+            error_rate: (float) the rate of false positives at capacity
+        '''
+        bits = max(64, int(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.num_bits = bits
+        self.num_hashes = max(1, round(bits / capacity * math.log(2)))
+        self.bits = bytearray((bits + 7) // 8)
+        self.count = 0
+
+    def _positions(self, h):
+        # double hashing: the two halves of the 64-bit hash
+        h1 = h & 0xffffffff
+        h2 = (h >> 32) | 1
+        return [(h1 + i * h2) % self.num_bits for i in range(self.num_hashes)]
+
+    def __contains__(self, url):
+        return self.contains_hash(url_hash(url))
+
+    def contains_hash(self, h):
+        bits = self.bits
+        return all(bits[p >> 3] & (1 << (p & 7)) for p in self._positions(h))
+
+    def add(self, url):
+        h = url_hash(url)
+        self.add_hash(h)
+        return h
+
+    def add_hash(self, h):
+        bits = self.bits
+        for p in self._positions(h):
+            bits[p >> 3] |= 1 << (p & 7)
+        self.count += 1
+
+    def __len__(self):
+        return self.count
+
+
+class CrawlState(object):
+    def __init__(self, path):
+        '''
+        Constructor: open (or create) the state file of a crawl
+
+        Inputs:
+            path: (string) name of the SQLite file
+        '''
+        self.path = path
+        self.db = sqlite3.connect(path)
+        self.db.executescript(SCHEMA)
+        self.spilled = self.db.execute(
+            "SELECT COUNT(*) FROM spill").fetchone()[0]
+
+    def get(self, key, default=None):
+        row = self.db.execute("SELECT value FROM meta WHERE key = ?",
+                              (key,)).fetchone()
+        return default if row is None else row[0]
+
+    def set(self, key, value):
+        self.db.execute("INSERT OR REPLACE INTO meta VALUES (?, ?)",
+                        (key, value))
+
+    def check(self, starting_url, limiting_domain):
+        '''
+        Make sure the state file belongs to a crawl of the same site, and
+        record the site if it is a new file
+
+        Raises:
+            ValueError if the file belongs to another crawl
+        '''
+        started = (self.get("starting_url"), self.get("limiting_domain"))
+        if started == (None, None):
+            self.set("starting_url", starting_url)
+            self.set("limiting_domain", limiting_domain)
+            self.db.commit()
+        elif started != (starting_url, limiting_domain):
+            raise ValueError("%s holds a crawl from %s in %s"
+                             % (self.path, started[0], started[1]))
+
+    @property
+    def pages(self):
+        return self.get("pages", 0)
+
+    def load_frontier(self):
+        '''
+        Get the URLs of the frontier at the last checkpoint, in order
+        '''
+        return [url for (url,) in
+                self.db.execute("SELECT url FROM frontier ORDER BY seq")]
+
+    def iter_visited(self):
+        '''
+        Get the hashes of the visited URLs
+        '''
+        return (h for (h,) in self.db.execute("SELECT hash FROM visited"))
+
+    def add_visited(self, h):
+        self.db.execute("INSERT OR IGNORE INTO visited VALUES (?)", (h,))
+
+    def spill(self, url):
+        '''
+        Put a URL at the end of the part of the frontier kept on disk
+        '''
+        self.db.execute("INSERT INTO spill (url) VALUES (?)", (url,))
+        self.spilled += 1
+
+    def unspill(self, n):
+        '''
+        Take up to n URLs from the front of the part of the frontier kept
+        on disk
+        '''
+        rows = self.db.execute("SELECT seq, url FROM spill ORDER BY seq "
+                               "LIMIT ?", (n,)).fetchall()
+        if rows:
+            self.db.execute("DELETE FROM spill WHERE seq <= ?", (rows[-1][0],))
+            self.spilled -= len(rows)
+        return [url for _, url in rows]
+
+    def checkpoint(self, pages, frontier):
+        '''
+        Commit everything written since the last checkpoint
+
+        Inputs:
+            pages: (int) the number of pages processed
+            frontier: (list of strings) the URLs of the frontier kept in
+              memory, including those being fetched, in order
+        '''
+        self.db.execute("DELETE FROM frontier")
+        self.db.executemany("INSERT INTO frontier (url) VALUES (?)",
+                            ((url,) for url in frontier))
+        self.set("pages", pages)
+        self.db.commit()
+
+    def clear(self):
+        '''
+        Forget a crawl that has ended, so that the next one starts over
+        '''
+        for table in ("meta", "frontier", "spill", "visited"):
+            self.db.execute("DELETE FROM %s" % table)
+        self.db.commit()
+        self.spilled = 0
+
+    def rollback(self):
+        '''
+        Drop everything written since the last checkpoint
+        '''
+        self.db.rollback()
+        self.spilled = self.db.execute(
+            "SELECT COUNT(*) FROM spill").fetchone()[0]
+
+    def close(self):
+        self.db.close()
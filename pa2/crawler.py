@@ -1,15 +1,27 @@
 # CS122: Course Search Engine Part 1
 #
-# Your name(s)
+# Corry Ke
 #
+# The crawl itself is run by crawl_engine.Crawler, which fetches many
+# pages at once and parses them in a pool of processes; this file decides
+# what to do with a page: find its courses with catalog_parser and the
+# words to index them under (parse_page, in a worker process).  The index
+# is kept by an index_store.IndexStore, which skips the pages and course
+# blocks that have not changed since the last crawl.
 
+import argparse
+import os
 import re
+import urllib.parse
 import util
-import bs4
-import queue
 import json
-import sys
-import csv
+
+import catalog_parser
+import crawl_engine
+import crawl_state
+import http_cache
+import index_store
+import inverted_index
 
 INDEX_IGNORE = set(['a', 'also', 'an', 'and', 'are', 'as', 'at', 'be',
                     'but', 'by', 'course', 'for', 'from', 'how', 'i',
@@ -20,44 +32,245 @@ INDEX_IGNORE = set(['a', 'also', 'an', 'and', 'are', 'as', 'at', 'be',
                     'yet'])
 
 
-### YOUR FUNCTIONS HERE
+STARTING_URL = ("http://www.classes.cs.uchicago.edu/archive/2015/winter"
+                "/12200-1/new.collegecatalog.uchicago.edu/index.html")
+LIMITING_DOMAIN = "classes.cs.uchicago.edu"
+
+# the words of a title or description
+WORD_RE = re.compile(r"[a-zA-Z]\w*")
+
+
+def get_words(text):
+    '''
+    Get the words of a text that go in the index
+
+    Inputs:
+        text: (string) the text
+
+    Returns:
+        (set of strings) the lowercased words, without those in INDEX_IGNORE
+    '''
+    words = set(w.lower() for w in WORD_RE.findall(text))
+    return words - INDEX_IGNORE
+
+
+def get_course_code(title):
+    '''
+    Get the course code from the title of a course block, e.g.
+    "CMSC 12200" from "CMSC 12200.  Computer Science with Applications II."
+    '''
+    return title.replace("\xa0", " ").split(".")[0].strip()
+
+
+def parse_page(url, html, context=None):
+    '''
+    Find the courses and the links of a page; the parse stage of the
+    crawl, run in a worker process
+
+    Inputs:
+        url: (string) the URL of the page
+        html: (bytes) the page
+        context: (tuple) the hash of the page and the hashes of the
+          blocks it had at the last crawl, from IndexStore.prepare_page
+
+    Returns:
+        (list of strings, tuple) the targets of the links, and the hash
+        of the page, the (block hash, (course code, set of words)) pairs
+        of its courses and the targets of the links again, for the
+        IndexStore.  A course in a sequence has the words of the sequence
+        too.  A block that was on the page before is not tokenized again:
+        its pair is (block hash, None).
+    '''
+    if context is None:
+        context = (index_store.page_hash(html), frozenset())
+    h, known = context
+    courses, links = catalog_parser.parse_page(html)
+    blocks = []
+    for course in courses:
+        block = index_store.block_hash(course)
+        if block in known:
+            blocks.append((block, None))
+        else:
+            words = get_words(course.text) | get_words(course.sequence)
+            blocks.append((block, (get_course_code(course.title), words)))
+    return links, (h, blocks, links)
+
 
-def go(num_pages_to_crawl, course_map_filename, index_filename):
+def write_index(index, index_filename):
     '''
-    Crawl the college catalog and generate a CSV file with an index.
+    Write the index: as a CSV file with a line course_id|word per word of
+    each course if the name ends in .csv, in the binary format of
+    inverted_index otherwise
+    '''
+    if index_filename.endswith(".csv"):
+        inverted_index.write_csv(index, index_filename)
+    else:
+        inverted_index.write_index(index, index_filename)
+
+
+def go(num_pages_to_crawl, course_map_filename, index_filename,
+       starting_url=STARTING_URL, limiting_domain=LIMITING_DOMAIN,
+       state_filename=None, bloom_capacity=None, cache_filename=None,
+       offline=False, store_filename=None, **options):
+    '''
+    Crawl the college catalog and write its index, in the binary format
+    of inverted_index or as a CSV file.
 
     Inputs:
         num_pages_to_crawl: the number of pages to process during the crawl
         course_map_filename: the name of a JSON file that contains the mapping of
           course codes to course identifiers
-        index_filename: the name for the CSV of the index.
+        index_filename: the name for the index: a CSV file if it ends
+          in .csv, a binary inverted_index file otherwise
+        starting_url: the first page of the crawl
+        limiting_domain: the domain the crawl stays in
+        state_filename: the name of a file to checkpoint the crawl to,
+          and to resume it from if it holds an interrupted crawl, or None
+        bloom_capacity: keep the visited URLs in a Bloom filter sized for
+          this many URLs, or None to keep their hashes
+        cache_filename: the name of an http_cache.HttpCache file to fetch
+          the pages through, or None
+        offline: serve the pages only from the cache
+        store_filename: the name of the index_store.IndexStore file that
+          keeps the index between crawls, or None to build the index
+          from scratch in memory; needed to resume a crawl
+        options: workers, per_host, delay, parse_workers, queue_size,
+          frontier_size and checkpoint_every of the crawl_engine.Crawler
 
     Outputs:
-        CSV file of the index
-    '''
+        the file of the index
 
-    starting_url = ("http://www.classes.cs.uchicago.edu/archive/2015/winter"
-                    "/12200-1/new.collegecatalog.uchicago.edu/index.html")
-    limiting_domain = "classes.cs.uchicago.edu"
+    Returns:
+        (dict) the statistics of the crawl
+    '''
+    with open(course_map_filename) as f:
+        course_map = json.load(f)
+    if state_filename is not None and store_filename is None:
+        raise ValueError("a crawl that can be resumed needs an index store")
+    store = index_store.IndexStore(store_filename or ":memory:", course_map)
+    state = None
+    if state_filename is not None:
+        state = crawl_state.CrawlState(state_filename)
+        state.check(starting_url, limiting_domain)
+    if state is None or state.pages == 0:
+        store.start_crawl()
+    visited = None
+    if bloom_capacity is not None:
+        visited = crawl_state.BloomFilter(bloom_capacity)
+    cache = None
+    if cache_filename is not None:
+        cache = http_cache.HttpCache(cache_filename, offline)
+        util.use_cache(cache)
+        if offline:
+            # no server to be polite to
+            options["delay"] = 0
 
-    # YOUR CODE HERE
+    try:
+        crawler = crawl_engine.Crawler(limiting_domain, parse_page,
+                                       store.merge_page,
+                                       prepare_page=store.prepare_page,
+                                       state=state, visited=visited, **options)
+        stats = crawler.crawl(starting_url, num_pages_to_crawl)
+        if stats["complete"]:
+            stats["pruned"] = store.prune()
+        index = store.load_index()
+        stats["index"] = store.stats()
+    finally:
+        store.close()
+        if state is not None:
+            state.close()
+        if cache is not None:
+            util.use_cache(None)
+            cache.close()
+    write_index(index, index_filename)
+    if cache is not None:
+        stats["cache"] = cache.stats()
+    stats["courses"] = len(index)
+    return stats
 
 
 if __name__ == "__main__":
-    usage = "python3 crawl.py <number of pages to crawl>"
-    args_len = len(sys.argv)
-    course_map_filename = "course_map.json"
-    index_filename = "catalog_index.csv"
-    if args_len == 1:
-        num_pages_to_crawl = 1000
-    elif args_len == 2:
-        try:
-            num_pages_to_crawl = int(sys.argv[1])
-        except ValueError:
-            print(usage)
-            sys.exit(0)
-    else:
-        print(usage)
-        sys.exit(0)
+    parser = argparse.ArgumentParser(
+        description="Crawl the college catalog and index its courses")
+    parser.add_argument("num_pages_to_crawl", type=int, nargs="?",
+                        default=1000)
+    parser.add_argument("--start", default=STARTING_URL,
+                        help="the first page (default: the catalog)")
+    parser.add_argument("--domain",
+                        help="the limiting domain (default: the catalog's, "
+                        "or the host of --start)")
+    parser.add_argument("--workers", type=int,
+                        default=crawl_engine.DEFAULT_WORKERS,
+                        help="requests in flight")
+    parser.add_argument("--per-host", type=int,
+                        default=crawl_engine.DEFAULT_PER_HOST,
+                        help="requests in flight to one host")
+    parser.add_argument("--delay", type=float,
+                        default=crawl_engine.DEFAULT_DELAY,
+                        help="seconds between requests to one host")
+    parser.add_argument("--index", default="catalog_index.idx",
+                        help="the binary index to write (default: "
+                        "%(default)s; a name ending in .csv writes a CSV)")
+    parser.add_argument("--csv", default="catalog_index.csv",
+                        help="also export the index to this CSV file, which "
+                        "pa3 loads (default: %(default)s; \"\" for none)")
+    parser.add_argument("--parse-workers", type=int,
+                        default=crawl_engine.DEFAULT_PARSE_WORKERS,
+                        help="processes that parse pages, 0 to parse in the "
+                        "main process (default: one per core)")
+    parser.add_argument("--state", default="crawl_state.db",
+                        help="file to checkpoint the crawl to and resume it "
+                        "from (default: %(default)s)")
+    parser.add_argument("--fresh", action="store_true",
+                        help="start a new crawl instead of resuming")
+    parser.add_argument("--store", default="catalog_store.db",
+                        help="file that keeps the index between crawls "
+                        "(default: %(default)s)")
+    parser.add_argument("--rebuild", action="store_true",
+                        help="index every page again, from scratch")
+    parser.add_argument("--bloom", type=int, metavar="CAPACITY",
+                        help="keep the visited URLs in a Bloom filter sized "
+                        "for CAPACITY URLs")
+    parser.add_argument("--cache", default="http_cache.db",
+                        help="file of the HTTP cache (default: %(default)s)")
+    parser.add_argument("--no-cache", action="store_true",
+                        help="fetch every page from the server")
+    parser.add_argument("--offline", action="store_true",
+                        help="serve the pages only from the HTTP cache")
+    args = parser.parse_args()
+    if args.fresh and os.path.exists(args.state):
+        os.remove(args.state)
+    if args.rebuild:
+        for name in (args.state, args.store):
+            for suffix in ("", "-wal", "-shm"):
+                if os.path.exists(name + suffix):
+                    os.remove(name + suffix)
+
+    limiting_domain = args.domain
+    if limiting_domain is None:
+        if args.start == STARTING_URL:
+            limiting_domain = LIMITING_DOMAIN
+        else:
+            limiting_domain = urllib.parse.urlsplit(args.start).netloc
 
-    go(num_pages_to_crawl, course_map_filename, index_filename)
+    stats = go(args.num_pages_to_crawl, "course_map.json", args.index,
+               args.start, limiting_domain, args.state, args.bloom,
+               None if args.no_cache else args.cache, args.offline,
+               workers=args.workers, per_host=args.per_host, delay=args.delay,
+               store_filename=args.store, parse_workers=args.parse_workers)
+    print("%(pages)d pages (%(failed)d failed) in %(seconds).1f s, "
+          "%(courses)d courses indexed" % stats)
+    print("%(changed)d pages indexed, %(unchanged)d unchanged; %(tokenized)d "
+          "blocks tokenized; %(added)d postings added, %(removed)d removed"
+          % stats["index"])
+    if args.csv and not args.index.endswith(".csv"):
+        index = inverted_index.InvertedIndex(args.index)
+        inverted_index.write_csv(index.to_dict(), args.csv)
+        index.close()
+    for stage, s in stats["stages"].items():
+        print("%-6s %6d pages %8.1f pages/s %8.2f ms/page %6.1f in progress"
+              % (stage, s["pages"], s["per_second"], s["ms_per_page"],
+                 s["concurrency"]))
+    if "cache" in stats:
+        print("cache: %(hits)d hits, %(revalidated)d not modified, "
+              "%(fetched)d fetched, %(misses)d misses" % stats["cache"])
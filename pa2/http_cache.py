@@ -0,0 +1,163 @@
+# CS122: Course Search Engine Part 1
+# On-disk HTTP cache with conditional GETs
+#
+# Corry Ke
+#
+# Most pages of the catalog never change, so a recrawl should not
+# download them again.  An HttpCache keeps every page util.get_request
+# fetched in a SQLite file, keyed by its URL without the fragment, with
+# the body compressed with zlib and the ETag and Last-Modified headers
+# the server sent.  On a recrawl the cached validators go out as
+# If-None-Match and If-Modified-Since, and a 304 answer is served from the
+# cache.  In offline mode the cache never goes to the network: a page is
+# served from the cache or not at all, so a repeated index build needs no
+# server.
+#
+# util.use_cache(cache) puts a cache under util.get_request; what it
+# returns for a cached page answers .url, .status_code, .content and
+# .text like a requests.Response, so util.read_request and
+# util.get_request_url work unchanged.
+#
+# Usage (statistics of a cache file):
+#   python3 http_cache.py CACHE_FILE
+
+import sqlite3
+import sys
+import threading
+import time
+import zlib
+
+import util
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS pages (
+    url TEXT PRIMARY KEY,
+    final_url TEXT,
+    encoding TEXT,
+    etag TEXT,
+    last_modified TEXT,
+    fetched REAL,
+    body BLOB);
+'''
+
+
+class CachedResponse(object):
+    '''
+    A page served from the cache
+    '''
+    def __init__(self, url, content, encoding):
+        self.url = url
+        self.status_code = 200
+        self.content = content
+        self.encoding = encoding
+
+    @property
+    def text(self):
+        return self.content.decode(self.encoding or "utf-8", errors="replace")
+
+
+class HttpCache(object):
+    def __init__(self, path, offline=False):
+        '''
+        Constructor: open (or create) a cache file
+
+        Inputs:
+            path: (string) name of the SQLite file
+            offline: (bool) serve pages only from the cache
+        '''
+        self.path = path
+        self.offline = offline
+        # get is called from the threads of the crawl engine
+        self._lock = threading.Lock()
+        self.db = sqlite3.connect(path, isolation_level=None,
+                                  check_same_thread=False)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=NORMAL")
+        self.db.executescript(SCHEMA)
+        self.hits = 0
+        self.revalidated = 0
+        self.fetched = 0
+        self.misses = 0
+
+    def _lookup(self, key):
+        with self._lock:
+            return self.db.execute(
+                "SELECT final_url, encoding, etag, last_modified, body "
+                "FROM pages WHERE url = ?", (key,)).fetchone()
+
+    def _store(self, key, response):
+        encoding = response.encoding or response.apparent_encoding
+        row = (key, response.url, encoding, response.headers.get("ETag"),
+               response.headers.get("Last-Modified"), time.time(),
+               zlib.compress(response.content))
+        with self._lock:
+            self.db.execute("INSERT OR REPLACE INTO pages "
+                            "VALUES (?, ?, ?, ?, ?, ?, ?)", row)
+
+    def get(self, url, timeout=util.TIMEOUT):
+        '''
+        Get a page, from the cache if it is there and has not changed
+
+        Inputs:
+            url: (string) an absolute URL
+            timeout: seconds to wait for the server
+
+        Returns:
+            a requests.Response or CachedResponse, or None if the page
+            could not be fetched (or, offline, is not in the cache)
+        '''
+        key = util.remove_fragment(url)
+        entry = self._lookup(key)
+        if self.offline:
+            if entry is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            return CachedResponse(entry[0], zlib.decompress(entry[4]),
+                                  entry[1])
+
+        headers = {}
+        if entry is not None:
+            if entry[2] is not None:
+                headers["If-None-Match"] = entry[2]
+            if entry[3] is not None:
+                headers["If-Modified-Since"] = entry[3]
+        try:
+            r = util.get_session().get(key, headers=headers, timeout=timeout)
+        except Exception:
+            # fail on any kind of error
+            return None
+        if r.status_code == 304 and entry is not None:
+            self.revalidated += 1
+            return CachedResponse(entry[0], zlib.decompress(entry[4]),
+                                  entry[1])
+        if r.status_code == 404 or r.status_code == 403:
+            return None
+        if r.status_code == 200:
+            self._store(key, r)
+        self.fetched += 1
+        return r
+
+    def stats(self):
+        '''
+        Get the counts of the pages served, by where they came from
+
+        Returns:
+            (dict) hits (offline), revalidated (304), fetched and misses
+        '''
+        return {"hits": self.hits, "revalidated": self.revalidated,
+                "fetched": self.fetched, "misses": self.misses}
+
+    def close(self):
+        with self._lock:
+            self.db.close()
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 2:
+        print("Usage: python3 http_cache.py CACHE_FILE")
+        sys.exit(1)
+    db = sqlite3.connect(sys.argv[1])
+    pages, stored = db.execute("SELECT COUNT(*), SUM(LENGTH(body)) "
+                               "FROM pages").fetchone()
+    print("%d pages, %.1f MB compressed" % (pages, (stored or 0) / 2 ** 20))
@@ -0,0 +1,250 @@
+# CS122: Course Search Engine Part 1
+# Incrementally maintained catalog index
+#
+# Corry Ke
+#
+# An IndexStore keeps the index of the catalog in a SQLite file between
+# crawls, together with what it was built from, so that a recrawl only
+# does the work of what changed:
+#
+#   pages         per page: the hash of its contents, its links, and the
+#                 crawl that last saw it
+#   page_blocks   the hashes of the course blocks on each page
+#   blocks        per distinct block: its course and the words it
+#                 indexes the course under, and the number of pages it is on
+#   postings      per (course, word): the number of blocks that put the
+#                 word in the index of the course
+#
+# A page whose hash has not changed is not parsed at all; its stored
+# links keep the crawl going.  A changed page is parsed, but only its
+# blocks that were not on it before are tokenized.  The difference
+# between the old and the new blocks of a page is then applied as deltas:
+# a block that appeared adds one to the postings of its words, one that
+# disappeared takes one away, and a posting that drops to zero leaves the
+# index.  A crawl that runs to the end of its frontier, without dropping
+# a link because the frontier was full, prunes the pages it did not see.
+# Each page is committed on its own, and applying the same page twice
+# changes nothing, so a crawl that dies and is resumed leaves the store
+# right.
+
+import hashlib
+import sqlite3
+from collections import Counter
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value);
+CREATE TABLE IF NOT EXISTS pages (
+    url TEXT PRIMARY KEY, hash BLOB, links TEXT, seen INTEGER);
+CREATE TABLE IF NOT EXISTS page_blocks (
+    url TEXT, block BLOB, n INTEGER, PRIMARY KEY (url, block)) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS blocks (
+    hash BLOB PRIMARY KEY, course_id INTEGER, words TEXT, refs INTEGER)
+    WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS postings (
+    course_id INTEGER, word TEXT, refs INTEGER,
+    PRIMARY KEY (course_id, word)) WITHOUT ROWID;
+'''
+
+
+def page_hash(html):
+    '''
+    Hash the contents of a page
+    '''
+    return hashlib.blake2b(html, digest_size=16).digest()
+
+
+def block_hash(course):
+    '''
+    Hash the text of a course block (a catalog_parser.Course)
+    '''
+    text = "\0".join(course).encode("utf-8")
+    return hashlib.blake2b(text, digest_size=16).digest()
+
+
+class IndexStore(object):
+    def __init__(self, path, course_map):
+        '''
+        Constructor: open (or create) the store of an index
+
+        Inputs:
+            path: (string) name of the SQLite file, or ":memory:"
+            course_map: (dict) course code -> course identifier
+        '''
+        self.path = path
+        self.course_map = course_map
+        self.db = sqlite3.connect(path)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=NORMAL")
+        self.db.executescript(SCHEMA)
+        row = self.db.execute(
+            "SELECT value FROM meta WHERE key = 'generation'").fetchone()
+        # the number of the current crawl
+        self.generation = 0 if row is None else row[0]
+        self.unchanged = 0
+        self.changed = 0
+        self.tokenized = 0
+        self.added = 0
+        self.removed = 0
+
+    def start_crawl(self):
+        '''
+        Start a new crawl: pages not seen by it are pruned when it ends
+        '''
+        self.generation += 1
+        self.db.execute("INSERT OR REPLACE INTO meta VALUES ('generation', ?)",
+                        (self.generation,))
+        self.db.commit()
+
+    def prepare_page(self, url, html):
+        '''
+        Decide whether a fetched page needs parsing (the prepare_page of
+        the crawl_engine.Crawler)
+
+        Returns:
+            (True, the stored parse result) if the page has not changed,
+            or (False, the page's hash and its old block hashes) for
+            crawler.parse_page
+        '''
+        h = page_hash(html)
+        row = self.db.execute("SELECT hash, links FROM pages WHERE url = ?",
+                              (url,)).fetchone()
+        if row is not None and row[0] == h:
+            links = row[1].split("\n") if row[1] else []
+            return True, (links, (h, None, links))
+        known = frozenset(b for (b,) in self.db.execute(
+            "SELECT block FROM page_blocks WHERE url = ?", (url,)))
+        return False, (h, known)
+
+    def _add(self, block, k, info):
+        '''
+        Add k references to a block, creating it from info, a (course
+        code, set of words) pair, if it is new
+        '''
+        row = self.db.execute("SELECT course_id, words FROM blocks "
+                              "WHERE hash = ?", (block,)).fetchone()
+        if row is None:
+            code, words = info
+            course_id = self.course_map.get(code)
+            if course_id is None:
+                words = ()
+            self.db.execute("INSERT INTO blocks VALUES (?, ?, ?, 0)",
+                            (block, course_id, " ".join(sorted(words))))
+        else:
+            course_id, words = row
+            words = words.split()
+        self.db.execute("UPDATE blocks SET refs = refs + ? WHERE hash = ?",
+                        (k, block))
+        for word in words:
+            cur = self.db.execute(
+                "UPDATE postings SET refs = refs + ? "
+                "WHERE course_id = ? AND word = ?", (k, course_id, word))
+            if cur.rowcount == 0:
+                self.db.execute("INSERT INTO postings VALUES (?, ?, ?)",
+                                (course_id, word, k))
+                self.added += 1
+
+    def _remove(self, block, k):
+        '''
+        Take k references away from a block
+        '''
+        course_id, words, refs = self.db.execute(
+            "SELECT course_id, words, refs FROM blocks WHERE hash = ?",
+            (block,)).fetchone()
+        if refs <= k:
+            self.db.execute("DELETE FROM blocks WHERE hash = ?", (block,))
+        else:
+            self.db.execute("UPDATE blocks SET refs = ? WHERE hash = ?",
+                            (refs - k, block))
+        for word in words.split():
+            self.db.execute("UPDATE postings SET refs = refs - ? "
+                            "WHERE course_id = ? AND word = ?",
+                            (k, course_id, word))
+            cur = self.db.execute("DELETE FROM postings WHERE course_id = ? "
+                                  "AND word = ? AND refs <= 0",
+                                  (course_id, word))
+            self.removed += cur.rowcount
+
+    def _set_blocks(self, url, new):
+        '''
+        Replace the blocks of a page, applying the difference to the index
+        '''
+        old = Counter(dict(self.db.execute(
+            "SELECT block, n FROM page_blocks WHERE url = ?", (url,))))
+        counts = Counter(b for b, _ in new)
+        info = dict(new)
+        for block, k in (old - counts).items():
+            self._remove(block, k)
+        for block, k in (counts - old).items():
+            self._add(block, k, info[block])
+        self.db.execute("DELETE FROM page_blocks WHERE url = ?", (url,))
+        self.db.executemany("INSERT INTO page_blocks VALUES (?, ?, ?)",
+                            ((url, b, k) for b, k in counts.items()))
+
+    def merge_page(self, url, result):
+        '''
+        Bring the index up to date with a page (the merge_page of the
+        crawl_engine.Crawler)
+
+        Inputs:
+            url: (string) the URL of the page
+            result: (tuple) the hash of the page, its (block hash,
+              (course code, set of words)) pairs and its links, as
+              returned by crawler.parse_page; the pairs are None for a
+              page that has not changed, and the words None for a block
+              that was already on the page
+        '''
+        h, blocks, links = result
+        if blocks is None:
+            self.unchanged += 1
+            self.db.execute("UPDATE pages SET seen = ? WHERE url = ?",
+                            (self.generation, url))
+        else:
+            self.changed += 1
+            self.tokenized += sum(1 for _, info in blocks if info is not None)
+            self._set_blocks(url, blocks)
+            self.db.execute("INSERT OR REPLACE INTO pages VALUES (?, ?, ?, ?)",
+                            (url, h, "\n".join(links), self.generation))
+        self.db.commit()
+
+    def prune(self):
+        '''
+        Drop the pages the current crawl did not see from the index
+
+        Returns:
+            (int) the number of pages dropped
+        '''
+        urls = [url for (url,) in self.db.execute(
+            "SELECT url FROM pages WHERE seen < ?", (self.generation,))]
+        for url in urls:
+            self._set_blocks(url, [])
+            self.db.execute("DELETE FROM pages WHERE url = ?", (url,))
+        self.db.commit()
+        return len(urls)
+
+    def load_index(self):
+        '''
+        Get the index
+
+        Returns:
+            (dict) course identifier -> set of words
+        '''
+        index = {}
+        for course_id, word in self.db.execute(
+                "SELECT course_id, word FROM postings"):
+            index.setdefault(course_id, set()).add(word)
+        return index
+
+    def stats(self):
+        '''
+        Get the counts of the work done since the store was opened
+
+        Returns:
+            (dict) pages unchanged and changed, blocks tokenized, and
+            postings added and removed
+        '''
+        return {"unchanged": self.unchanged, "changed": self.changed,
+                "tokenized": self.tokenized, "added": self.added,
+                "removed": self.removed}
+
+    def close(self):
+        self.db.close()
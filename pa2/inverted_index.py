@@ -0,0 +1,273 @@
+# CS122: Course Search Engine Part 1
+# Binary inverted index of the catalog
+#
+# Corry Ke
+#
+# Instead of one course_id|word line per pair, the index can be written
+# as an inverted index: for each word, in sorted order, the list of the
+# identifiers of the courses it indexes.  The file is laid out so that it
+# can be memory-mapped and queried in place, without parsing:
+#
+#   header        MAGIC, version, number of words
+#   word_starts   uint32[n + 1]: where each word starts in the words area
+#   post_starts   uint32[n + 1]: where each list starts in the postings area
+#   counts        uint32[n]: the number of courses of each word
+#   words         the UTF-8 words, sorted by their bytes, back to back
+#   postings      the sorted course identifiers of each word, as the
+#                 differences between neighbours, each a varint (seven
+#                 bits a byte, low bits first, high bit set on all but
+#                 the last byte)
+#
+# A word is found by binary search over word_starts, and its list is
+# decoded from the postings area.  write_csv exports the CSV format that
+# pa3 loads into its catalog_index table.
+#
+# Usage:
+#   python3 inverted_index.py INDEX_FILE [--csv CSV_FILE] [WORD ...]
+
+import argparse
+import csv
+import mmap
+import struct
+import sys
+from array import array
+
+MAGIC = b"CS122IDX"
+VERSION = 1
+# magic, version, number of words
+HEADER = struct.Struct("<8sII")
+
+
+def encode_postings(ids, out):
+    '''
+    Append the varint deltas of sorted course identifiers to a bytearray
+    '''
+    previous = 0
+    for i in ids:
+        delta = i - previous
+        previous = i
+        while delta >= 0x80:
+            out.append((delta & 0x7f) | 0x80)
+            delta >>= 7
+        out.append(delta)
+
+
+def decode_postings(buf, start, end):
+    '''
+    Decode the course identifiers stored in buf[start:end]
+    '''
+    ids = []
+    previous = 0
+    delta = 0
+    shift = 0
+    for i in range(start, end):
+        b = buf[i]
+        delta |= (b & 0x7f) << shift
+        if b & 0x80:
+            shift += 7
+        else:
+            previous += delta
+            ids.append(previous)
+            delta = 0
+            shift = 0
+    return ids
+
+
+def invert(index):
+    '''
+    Turn an index of the words of each course into the courses of each
+    word
+
+    Inputs:
+        index: (dict) course identifier -> set of words
+
+    Returns:
+        (dict) word -> sorted list of course identifiers
+    '''
+    postings = {}
+    for course_id in sorted(index):
+        for word in index[course_id]:
+            postings.setdefault(word, []).append(course_id)
+    return postings
+
+
+def write_index(index, filename):
+    '''
+    Write an index in the binary format
+
+    Inputs:
+        index: (dict) course identifier -> set of words
+        filename: (string) name of the file
+    '''
+    postings = invert(index)
+    words = sorted(postings, key=lambda w: w.encode("utf-8"))
+    word_starts = array('I', [0])
+    post_starts = array('I', [0])
+    counts = array('I')
+    word_area = bytearray()
+    post_area = bytearray()
+    for word in words:
+        word_area += word.encode("utf-8")
+        word_starts.append(len(word_area))
+        encode_postings(postings[word], post_area)
+        post_starts.append(len(post_area))
+        counts.append(len(postings[word]))
+    if sys.byteorder != "little":
+        for a in (word_starts, post_starts, counts):
+            a.byteswap()
+
+    with open(filename, "wb") as f:
+        f.write(HEADER.pack(MAGIC, VERSION, len(words)))
+        for data in (word_starts, post_starts, counts, word_area, post_area):
+            f.write(data)
+
+
+def write_csv(index, filename):
+    '''
+    Write an index as a CSV file with a line course_id|word per word of
+    each course, sorted
+
+    Inputs:
+        index: (dict) course identifier -> set of words
+        filename: (string) name of the file
+    '''
+    with open(filename, "w", newline="") as f:
+        writer = csv.writer(f, delimiter="|", lineterminator="\n")
+        for course_id in sorted(index):
+            for word in sorted(index[course_id]):
+                writer.writerow([course_id, word])
+
+
+class InvertedIndex(object):
+    def __init__(self, filename):
+        '''
+        Constructor: memory-map an index written by write_index
+
+        Inputs:
+            filename: (string) name of the file
+        '''
+        with open(filename, "rb") as f:
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        buf = memoryview(self._map)
+        magic, version, n = HEADER.unpack_from(buf)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError("%s is not an index of version %d"
+                             % (filename, VERSION))
+        self.num_words = n
+        pos = HEADER.size
+        tables = []
+        for size in (n + 1, n + 1, n):
+            table = buf[pos:pos + 4 * size].cast("I")
+            if sys.byteorder != "little":
+                table = array('I', table)
+                table.byteswap()
+            tables.append(table)
+            pos += 4 * size
+        self._word_starts, self._post_starts, self._counts = tables
+        self._words = buf[pos:pos + self._word_starts[n]]
+        pos += self._word_starts[n]
+        self._postings = buf[pos:pos + self._post_starts[n]]
+
+    def _word(self, i):
+        return bytes(self._words[self._word_starts[i]:self._word_starts[i + 1]])
+
+    def _find(self, word):
+        '''
+        Get the position of a word, or -1
+        '''
+        key = word.encode("utf-8")
+        lo = 0
+        hi = self.num_words
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._word(mid) < key:
+                lo = mid + 1
+            else:
+                hi = mid
+        if lo < self.num_words and self._word(lo) == key:
+            return lo
+        return -1
+
+    def __len__(self):
+        return self.num_words
+
+    def __contains__(self, word):
+        return self._find(word) >= 0
+
+    def count(self, word):
+        '''
+        Get the number of courses a word indexes
+        '''
+        i = self._find(word)
+        return 0 if i < 0 else self._counts[i]
+
+    def postings(self, word):
+        '''
+        Get the courses a word indexes
+
+        Returns:
+            (list of ints) the course identifiers, sorted
+        '''
+        i = self._find(word)
+        if i < 0:
+            return []
+        return decode_postings(self._postings, self._post_starts[i],
+                               self._post_starts[i + 1])
+
+    def search(self, words):
+        '''
+        Get the courses indexed by every one of a list of words
+
+        Returns:
+            (list of ints) the course identifiers, sorted
+        '''
+        lists = sorted((self.postings(w) for w in words), key=len)
+        if not lists:
+            return []
+        rv = set(lists[0])
+        for ids in lists[1:]:
+            rv.intersection_update(ids)
+        return sorted(rv)
+
+    def items(self):
+        '''
+        Get the (word, course identifiers) pairs of the index, by word
+        '''
+        for i in range(self.num_words):
+            yield (self._word(i).decode("utf-8"),
+                   decode_postings(self._postings, self._post_starts[i],
+                                   self._post_starts[i + 1]))
+
+    def to_dict(self):
+        '''
+        Get the index as course identifier -> set of words
+        '''
+        index = {}
+        for word, ids in self.items():
+            for course_id in ids:
+                index.setdefault(course_id, set()).add(word)
+        return index
+
+    def close(self):
+        self._word_starts = self._post_starts = self._counts = None
+        self._words = self._postings = None
+        self._map.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Query or export a binary catalog index")
+    parser.add_argument("index_file")
+    parser.add_argument("--csv", help="export the index to this CSV file")
+    parser.add_argument("words", nargs="*",
+                        help="print the courses indexed by all of the words")
+    args = parser.parse_args()
+
+    index = InvertedIndex(args.index_file)
+    if args.csv is not None:
+        write_csv(index.to_dict(), args.csv)
+    if args.words:
+        print(" ".join(map(str, index.search(args.words))))
+    elif args.csv is None:
+        print("%d words" % len(index))
+    index.close()
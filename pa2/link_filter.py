@@ -0,0 +1,155 @@
+# CS122: Course Search Engine Part 1
+# Batch resolution and filtering of the links of a page
+#
+# Corry Ke
+#
+# Every link of every page goes through util.remove_fragment,
+# util.convert_if_relative_url and util.is_url_ok_to_follow, which parse
+# the URL several times over.  A LinkFilter gives the same answers for a
+# whole page at once: the links of the page are de-duplicated first, the
+# URL of the page is split once for all of its relative links, and each
+# link is matched once against precompiled patterns that pick out the
+# scheme, the host and the path.  The host is checked against the
+# limiting domain through a cache, and the extension and archive rules are
+# plain string tests.  A link the patterns do not cover (one with a
+# query, a colon that is not part of http:// or https://, dot segments,
+# empty path segments, odd characters, ...) is handed to the functions of
+# util, so the rules are exactly theirs.
+
+import re
+
+import util
+
+# characters of a path that need no special treatment by urllib.parse
+_PATH = r"[A-Za-z0-9\-._~/%+,=!$&'()*]"
+# an absolute http(s) URL without a query, parameters or fragment
+ABSOLUTE_RE = re.compile(r"(https?)://([A-Za-z0-9\-._~%+,=!$&'()*]+"
+                         r"(?::[0-9]*)?)(/" + _PATH + r"*)?\Z", re.IGNORECASE)
+# a relative URL (path only) made of the same characters
+RELATIVE_RE = re.compile(_PATH + r"+\Z")
+# a path with a "." or ".." segment, or an empty segment
+DOTS_RE = re.compile(r"(?:^|/)\.\.?(?:/|$)|//")
+
+# the host suffixes that make convert_if_relative_url add "http://"
+_HOST_SUFFIXES = (".edu", ".org", ".com", ".net")
+
+
+def _extension_ok(path):
+    '''
+    Does the last segment of a path have no extension or ".html" (the
+    extension rule of is_url_ok_to_follow, as os.path.splitext sees it)?
+    '''
+    name = path[path.rfind("/") + 1:].lstrip(".")
+    return "." not in name or name.endswith(".html")
+
+
+class LinkFilter(object):
+    def __init__(self, limiting_domain):
+        '''
+        Constructor
+
+        Inputs:
+            limiting_domain: (string) the domain the crawl stays in
+        '''
+        self.limiting_domain = limiting_domain
+        self._suffix = "." + limiting_domain
+        # host -> is it in the limiting domain?
+        self._hosts = {}
+
+    def _host_ok(self, host):
+        ok = self._hosts.get(host)
+        if ok is None:
+            ok = host == self.limiting_domain or host.endswith(self._suffix)
+            self._hosts[host] = ok
+        return ok
+
+    def _ok(self, url, host, path):
+        return (self._host_ok(host) and _extension_ok(path)
+                and not url.startswith(util.ARCHIVES))
+
+    def is_ok(self, url):
+        '''
+        Is an absolute URL OK to follow?  (util.is_url_ok_to_follow)
+        '''
+        m = ABSOLUTE_RE.match(url)
+        if m is None:
+            return util.is_url_ok_to_follow(url, self.limiting_domain)
+        return self._ok(url, m.group(2), m.group(3) or "")
+
+    def _slow(self, current_url, href):
+        url = util.convert_if_relative_url(current_url,
+                                           util.remove_fragment(href))
+        if url is None or not util.is_url_ok_to_follow(url,
+                                                       self.limiting_domain):
+            return None
+        return url
+
+    def resolve(self, current_url, hrefs):
+        '''
+        Turn the targets of the links of a page into the URLs to crawl
+
+        Inputs:
+            current_url: (string) the URL of the page
+            hrefs: (iterable of strings) the targets of its links
+
+        Returns:
+            (list of strings) the URLs that are OK to follow, without
+            repeats, in the order of their first links
+        '''
+        # the scheme, host and directory of the page, for relative links
+        base = None
+        m = ABSOLUTE_RE.match(current_url)
+        if m is not None and DOTS_RE.search(m.group(3) or "") is None:
+            path = m.group(3) or "/"
+            # urljoin lowercases the scheme
+            base = (m.group(1).lower() + "://" + m.group(2), m.group(2),
+                    path[:path.rfind("/") + 1])
+
+        rv = {}
+        for href in dict.fromkeys(hrefs):
+            url = self._resolve(base, current_url, href)
+            if url is not None:
+                rv[url] = None
+        return list(rv)
+
+    def _resolve(self, base, current_url, href):
+        '''
+        Resolve and check the target of one link
+
+        Returns:
+            (string) the URL, or None if it should not be followed
+        '''
+        if base is None:
+            return self._slow(current_url, href)
+        link, hash_, _ = href.partition("#")
+        if link == "":
+            # util.remove_fragment leaves nothing
+            return None
+
+        m = ABSOLUTE_RE.match(link)
+        if m is not None:
+            if hash_ and not m.group(1).islower():
+                # util.remove_fragment lowercases the scheme
+                link = m.group(1).lower() + link[len(m.group(1)):]
+            path = m.group(3) or ""
+            if self._ok(link, m.group(2), path):
+                return link
+            return None
+
+        if RELATIVE_RE.match(link) is None or link[:2] == "//":
+            return self._slow(current_url, href)
+        host, slash, path = link.partition("/")
+        if host[-4:] in _HOST_SUFFIXES or link[:3] == "www":
+            url = "http://" + link
+            if host == "" or not self._ok(url, host, slash + path):
+                return None
+            return url
+
+        if DOTS_RE.search(link) is not None:
+            return self._slow(current_url, href)
+        prefix, host, directory = base
+        path = link if link[0] == "/" else directory + link
+        url = prefix + path
+        if not self._ok(url, host, path):
+            return None
+        return url